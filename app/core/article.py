@@ -0,0 +1,72 @@
+import sys
+
+class Article:
+    """
+    Slotted record for one news article, shared by every pipeline stage from
+    fetch_feed to the reporters. Stages fill in fields in place rather than
+    copying. Supports the dict-style access the pipeline is written against
+    (article['title'], article.get(...), 'sources' in article).
+    """
+
+    __slots__ = (
+        # Parsed from the feed (and kept in the feed HTTP cache)
+        'title', 'link', 'summary', 'published', 'source_name',
+        # Filled in by later stages
+        'translated_title', 'translated_summary', 'topic_key', 'category', 'category_source',
+        'sources', 'feed_order', 'signature', 'thread',
+    )
+    FEED_FIELDS = ('title', 'link', 'summary', 'published', 'source_name')
+    FIELDS = frozenset(__slots__)
+
+    def __init__(self, title='N/A', link='N/A', summary='', published=None, source_name='', **fields):
+        self.title = title
+        self.link = link
+        self.summary = summary
+        self.published = published
+        # Thousands of articles share a handful of source names
+        self.source_name = sys.intern(source_name) if source_name else source_name
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{key: value for key, value in data.items() if key in cls.FIELDS})
+
+    def feed_dict(self):
+        """The parsed-feed fields only, as stored in the feed HTTP cache."""
+        return {key: getattr(self, key, None) for key in self.FEED_FIELDS}
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__ if hasattr(self, key)}
+
+    def copy(self):
+        return Article.from_dict(self.to_dict())
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(f"Unknown article field: {key}")
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.FIELDS and hasattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self.FIELDS:
+            return default
+        return getattr(self, key, default)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def __repr__(self):
+        return f"Article({self.source_name!r}, {self.title!r})"
@@ -0,0 +1,132 @@
+"""
+Optional full-text enrichment: for articles whose feed summary is only a
+line or two, downloads the article page and replaces the summary with the
+page's main body text, so categorization and the digest have more to work
+with. Extracted text is cached by URL in news_data.db (article_text_cache),
+so each page is downloaded at most once per TTL across runs.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from bs4 import BeautifulSoup
+import config.settings as settings
+from app.core.fetcher import REQUEST_TIMEOUT, create_session, get_host_semaphore
+from app.core.news_db import load_article_texts, save_article_texts
+from app.core.processor import CJK_CHAR, CJK_CHARS_PER_WORD
+
+config = getattr(settings, 'NEWS_CONFIG', {}).get('article_text', {})
+
+ENABLED = config.get('enabled', False)
+MIN_SUMMARY_WORDS = config.get('min_summary_words', 40)    # Longer feed summaries are kept as they are
+WORKERS = config.get('workers', 8)                         # Concurrent page downloads
+TTL = config.get('ttl_days', 30) * 86400                   # Cached texts (and permanent failures) expire after this
+MAX_CHARS = config.get('max_chars', 4000)                  # Extracted text kept per article
+MIN_PARAGRAPH_CHARS = 40    # Shorter <p> blocks are captions, bylines and buttons
+BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'figure', 'iframe']
+
+def summary_words(text):
+    """Word count, with CJK text counted by characters like clip_to_render_budget does."""
+    cjk = len(CJK_CHAR.findall(text))
+    if cjk > len(text) * 0.2:
+        return cjk / CJK_CHARS_PER_WORD
+    return len(text.split())
+
+def needs_full_text(article):
+    """Short summaries only; articles already translated keep the text their translation was made from."""
+    link = article.get('link') or ''
+    return (link.startswith(('http://', 'https://')) and not article.get('translated_title')
+            and summary_words(article.get('summary') or '') < MIN_SUMMARY_WORDS)
+
+def extract_main_text(html):
+    """
+    Main body text of an article page: the paragraphs of the <article>
+    element or, failing that, of the element holding the most paragraph text.
+    Returns '' when nothing article-like is found.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+
+    containers = soup.find_all('article')
+    if containers:
+        root = max(containers, key=lambda element: len(element.get_text()))
+    else:
+        scores = {}
+        for paragraph in soup.find_all('p'):
+            parent = paragraph.parent
+            scores[id(parent)] = (scores.get(id(parent), (0, parent))[0] + len(paragraph.get_text()), parent)
+        if not scores:
+            return ''
+        root = max(scores.values(), key=lambda score: score[0])[1]
+
+    paragraphs = (paragraph.get_text(' ', strip=True) for paragraph in root.find_all('p'))
+    text = '\n\n'.join(paragraph for paragraph in paragraphs if len(paragraph) >= MIN_PARAGRAPH_CHARS)
+    return text[:MAX_CHARS]
+
+def is_transient_status(status):
+    """Rate limiting and server errors, which are worth retrying on a later run."""
+    return status == 429 or status >= 500
+
+def fetch_article_text(url, session):
+    """
+    Downloads one page and extracts its text. Returns '' on permanent
+    failures (cached as such) and None on transient ones (network errors,
+    429, 5xx), which are not cached so a later run tries again.
+    """
+    try:
+        with get_host_semaphore(url):
+            response = session.get(url, timeout=REQUEST_TIMEOUT)
+        if response.status_code >= 400:
+            print(f"    [WARN] Full text HTTP Error {response.status_code}: {url}")
+            return None if is_transient_status(response.status_code) else ''
+        if 'html' not in response.headers.get('Content-Type', 'text/html'):
+            return ''
+        return extract_main_text(response.text)
+    except Exception as e:
+        print(f"    [WARN] Full text failed: {url}, Error: {e}")
+        return None
+
+def enrich_articles(articles, enabled=None, offline=False, workers=WORKERS, verbose=True):
+    """
+    Replaces short feed summaries with the full article text, in place.
+    Pages are downloaded concurrently (at most PER_HOST_LIMIT per host, see
+    fetcher.py); cached texts younger than TTL are reused, and offline=True
+    (replay) uses only those. Returns the number of articles enriched.
+    """
+    if not (ENABLED if enabled is None else enabled):
+        return 0
+    candidates = [article for article in articles if needs_full_text(article)]
+    if not candidates:
+        return 0
+
+    now = time.time()
+    urls = list(dict.fromkeys(article['link'] for article in candidates))
+    texts = load_article_texts(urls, now - TTL)
+    missing = [] if offline else [url for url in urls if url not in texts]
+
+    fetched = {}
+    if missing:
+        session = create_session(pool_size=min(workers, len(missing)))
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                futures = {executor.submit(fetch_article_text, url, session): url for url in missing}
+                for future in as_completed(futures):
+                    text = future.result()
+                    if text is not None:
+                        fetched[futures[future]] = text
+        finally:
+            session.close()
+        save_article_texts(fetched, now, now - TTL)
+        texts.update(fetched)
+
+    enriched = 0
+    for article in candidates:
+        text = texts.get(article['link'])
+        # Keep the feed summary when the page yielded less than it
+        if text and len(text) > len(article.get('summary') or ''):
+            article['summary'] = text
+            enriched += 1
+    if verbose:
+        print(f"[*] Full text: {enriched} of {len(candidates)} short summaries enriched "
+              f"({len(texts) - len(fetched)} cached, {len(fetched)} downloaded, "
+              f"{len(missing) - len(fetched)} to retry).")
+    return enriched
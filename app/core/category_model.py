@@ -0,0 +1,247 @@
+"""
+Hashing TF-IDF centroid classifier used as a second categorization pass for
+articles the keyword rules leave unmatched. Trained offline from the
+categorized history in news_articles:
+
+    python -m app.core.category_model --train
+
+Only labels set by keyword rules or by hand are learned from (see
+news_articles.category_source); the model's own and the source fallback's
+labels would only reinforce its mistakes.
+
+The model is one float32 matrix (row 0: IDF weights, then one L2-normalized
+centroid per category) saved as .npy and memory-mapped at startup, plus a
+small JSON file with the category labels.
+"""
+import argparse
+import json
+import os
+import re
+import zlib
+from datetime import datetime
+from app.core.news_db import DATA_DIR, get_news_db_connection, init_news_db
+import config.settings as settings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+config = getattr(settings, 'NEWS_CONFIG', {}).get('category_model', {})
+
+ENABLED = config.get('enabled', True)
+MIN_SIMILARITY = config.get('min_similarity', 0.15)   # Cosine to the best centroid needed to assign it
+N_FEATURES = config.get('features', 1 << 16)           # Hashing vectorizer width
+MIN_SAMPLES = 5                                         # Categories with fewer training articles are left out
+
+MODEL_PATH = os.path.join(DATA_DIR, 'category_model.npy')
+LABELS_PATH = os.path.join(DATA_DIR, 'category_model.json')
+
+# Source-based fallback in processor.categorize_article; its labels say nothing about the text
+FALLBACK_SOURCES = ('anyfeeder', 'nytimes')
+FALLBACK_CATEGORY = "Politics & International"
+
+# Where an article's category came from (news_articles.category_source)
+KEYWORD = 'keyword'
+MODEL = 'model'
+FALLBACK = 'fallback'
+MANUAL = 'manual'      # Set by hand in news_data.db
+TRAINING_SOURCES = (KEYWORD, MANUAL)
+
+TOKEN = re.compile(r'[^\W\d_]{2,}')
+CJK_RUN = re.compile(r'[\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af]+')
+
+def classifier_text(title, summary, translated_title, translated_summary):
+    """Same text the keyword rules see: original plus translated title and summary."""
+    return f"{title or ''} {summary or ''} {translated_title or ''} {translated_summary or ''}".lower()
+
+def tokenize(text):
+    """Latin/Cyrillic words plus CJK character bigrams."""
+    tokens = TOKEN.findall(CJK_RUN.sub(' ', text))
+    for run in CJK_RUN.findall(text):
+        tokens.extend(run[i:i + 2] for i in range(max(len(run) - 1, 1)))
+    return tokens
+
+def hash_documents(texts, n_features=N_FEATURES):
+    """
+    Hashing vectorizer in coordinate form: returns (rows, cols, counts) arrays
+    with one entry per distinct (document, feature) pair. crc32 keeps feature
+    ids stable across processes.
+    """
+    rows, cols = [], []
+    for row, text in enumerate(texts):
+        features = [zlib.crc32(token.encode('utf-8')) % n_features for token in tokenize(text)]
+        rows.extend([row] * len(features))
+        cols.extend(features)
+    if not cols:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float32)
+    # Collapse repeated (row, col) pairs into counts
+    keys = np.array(rows, dtype=np.int64) * n_features + np.array(cols, dtype=np.int64)
+    unique, counts = np.unique(keys, return_counts=True)
+    return unique // n_features, unique % n_features, counts.astype(np.float32)
+
+def tfidf_weights(rows, cols, counts, idf, n_docs):
+    """Sublinear TF times IDF, L2-normalized per document."""
+    values = (1.0 + np.log(counts)) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=n_docs))
+    norms[norms == 0] = 1.0
+    return (values / norms[rows]).astype(np.float32)
+
+class CategoryModel:
+    """Memory-mapped centroid model; classify() scores a whole batch with array operations."""
+
+    def __init__(self, matrix, labels):
+        self.matrix = matrix
+        self.labels = labels
+        self.idf = matrix[0]
+        self.centroids = matrix[1:]
+
+    @classmethod
+    def load(cls, model_path=MODEL_PATH, labels_path=LABELS_PATH):
+        """Returns the saved model, or None when NumPy or the model files are missing."""
+        if np is None or not (os.path.exists(model_path) and os.path.exists(labels_path)):
+            return None
+        try:
+            with open(labels_path, 'r', encoding='utf-8') as f:
+                labels = json.load(f)['labels']
+            matrix = np.load(model_path, mmap_mode='r')
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARN] Failed to load category model: {e}")
+            return None
+        if not labels:
+            print("[WARN] Category model has no categories; ignoring the model.")
+            return None
+        if matrix.shape[0] != len(labels) + 1:
+            print("[WARN] Category model and labels file do not match; ignoring the model.")
+            return None
+        return cls(matrix, labels)
+
+    def classify(self, texts, allowed=None, min_similarity=MIN_SIMILARITY):
+        """Returns one category (or None when no centroid is close enough) per text."""
+        if not texts:
+            return []
+        if not self.labels:
+            return [None] * len(texts)
+        n_features = self.centroids.shape[1]
+        rows, cols, counts = hash_documents(texts, n_features)
+        scores = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        if len(cols):
+            values = tfidf_weights(rows, cols, counts, self.idf, len(texts))
+            # Gather only the touched feature columns from the memory-mapped centroids
+            touched, inverse = np.unique(cols, return_inverse=True)
+            columns = np.asarray(self.centroids[:, touched]).T
+            np.add.at(scores, rows, columns[inverse] * values[:, None])
+
+        if allowed is not None:
+            scores[:, [label not in allowed for label in self.labels]] = -1.0
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(texts)), best]
+        return [self.labels[i] if score >= min_similarity else None for i, score in zip(best, best_scores)]
+
+_model = None
+_model_loaded = False
+
+def get_category_model():
+    """Loads the model once per process (None if disabled or unavailable)."""
+    global _model, _model_loaded
+    if not _model_loaded:
+        _model = CategoryModel.load() if ENABLED else None
+        _model_loaded = True
+    return _model
+
+def load_training_rows():
+    """
+    (text, category) pairs from news_articles rows labelled by keyword rules
+    or by hand. Rows stored before category_source existed count when the
+    current keyword rules still give them the same category.
+    """
+    # processor imports this module
+    from app.core.processor import category_matcher
+
+    init_news_db()
+    conn = get_news_db_connection()
+    try:
+        rows = conn.execute(f'''
+            SELECT title, summary, translated_title, translated_summary, category, category_source
+            FROM news_articles
+            WHERE category IS NOT NULL AND category != 'Others'
+              AND (category_source IS NULL OR category_source IN ({', '.join('?' for _ in TRAINING_SOURCES)}))
+        ''', TRAINING_SOURCES).fetchall()
+    finally:
+        conn.close()
+    samples = []
+    for title, summary, translated_title, translated_summary, category, category_source in rows:
+        text = classifier_text(title, summary, translated_title, translated_summary)
+        if category_source is None and category_matcher.match(text) != category:
+            continue
+        samples.append((text, category))
+    return samples
+
+def fit(texts, labels, n_features=N_FEATURES):
+    """Returns (matrix, label_names): IDF row followed by one centroid per category."""
+    names = sorted(name for name in set(labels) if labels.count(name) >= MIN_SAMPLES)
+    keep = [i for i, label in enumerate(labels) if label in names]
+    texts = [texts[i] for i in keep]
+    label_ids = np.array([names.index(labels[i]) for i in keep], dtype=np.int64)
+
+    rows, cols, counts = hash_documents(texts, n_features)
+    document_frequency = np.bincount(cols, minlength=n_features)
+    idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1.0).astype(np.float32)
+    values = tfidf_weights(rows, cols, counts, idf, len(texts))
+
+    centroids = np.zeros((len(names), n_features), dtype=np.float32)
+    np.add.at(centroids, (label_ids[rows], cols), values)
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.vstack([idf, centroids / norms]).astype(np.float32), names
+
+def train(n_features=N_FEATURES, holdout=0.1):
+    """Trains on news_articles, reports held-out accuracy, then saves a model fit on all rows."""
+    if np is None:
+        print("[ERR] NumPy is required to train the category model (pip install numpy).")
+        return False
+    samples = load_training_rows()
+    if not samples:
+        print("[ERR] No categorized articles in news_data.db to train on.")
+        return False
+    texts = [text for text, _ in samples]
+    labels = [label for _, label in samples]
+
+    # Deterministic split so repeated runs report comparable numbers
+    test = [i for i, text in enumerate(texts) if zlib.crc32(text.encode('utf-8')) % 100 < holdout * 100]
+    test_set = set(test)
+    train_ids = [i for i in range(len(texts)) if i not in test_set]
+    if test and train_ids:
+        matrix, names = fit([texts[i] for i in train_ids], [labels[i] for i in train_ids], n_features)
+        predicted = CategoryModel(matrix, names).classify([texts[i] for i in test], min_similarity=0.0)
+        correct = sum(1 for i, label in zip(test, predicted) if label == labels[i])
+        print(f"[*] Held-out accuracy: {correct}/{len(test)} ({correct / len(test):.1%})")
+
+    matrix, names = fit(texts, labels, n_features)
+    if not names:
+        print(f"[ERR] No category has {MIN_SAMPLES} or more categorized articles yet; model not saved.")
+        return False
+    os.makedirs(DATA_DIR, exist_ok=True)
+    np.save(MODEL_PATH, matrix)
+    with open(LABELS_PATH, 'w', encoding='utf-8') as f:
+        json.dump({
+            'labels': names, 'features': n_features, 'samples': len(texts),
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+        }, f, ensure_ascii=False, indent=2)
+    size_mb = os.path.getsize(MODEL_PATH) / 1e6
+    print(f"[*] Trained category model on {len(texts)} articles ({len(names)} categories, {size_mb:.1f} MB): {MODEL_PATH}")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Fallback category classifier")
+    parser.add_argument('--train', action='store_true', help="Train from categorized articles in news_data.db")
+    parser.add_argument('--features', type=int, default=N_FEATURES, help="Hashing vectorizer width")
+    args = parser.parse_args()
+    if args.train:
+        train(n_features=args.features)
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
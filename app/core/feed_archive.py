@@ -0,0 +1,82 @@
+"""
+Append-only archive of raw feed bodies, so a digest can be reproduced or
+re-run with new rules without touching the network (main.py --replay).
+
+Each downloaded body is gzip-compressed as its own member and appended to a
+per-day, per-process segment file under data/feed_archive/; the feed_archive
+table in news_data.db indexes every record by feed URL and fetch time.
+"""
+import gzip
+import os
+import threading
+from datetime import datetime, timezone
+import config.settings as settings
+from app.core.news_db import DATA_DIR, delete_archive_index_before, save_archive_index
+
+config = getattr(settings, 'NEWS_CONFIG', {}).get('archive', {})
+
+ENABLED = config.get('enabled', True)
+KEEP_DAYS = config.get('keep_days', 30)                 # Segments older than this are deleted
+ARCHIVE_DIR = os.path.join(DATA_DIR, 'feed_archive')
+# Bodies fetched up to a day after the window still carry entries published inside it
+REPLAY_SLACK = 86400
+
+def segment_name(fetched_at):
+    """Segment for a record: one file per UTC day and writing process, so shards never share a file."""
+    day = datetime.fromtimestamp(fetched_at, timezone.utc).strftime('%Y-%m-%d')
+    return f"{day}-{os.getpid()}.gz"
+
+def read_body(record):
+    """Raw body of an indexed archive record."""
+    with open(os.path.join(ARCHIVE_DIR, record['segment']), 'rb') as f:
+        f.seek(record['offset'])
+        return gzip.decompress(f.read(record['length']))
+
+def prune_archive(now):
+    """Drops index rows and segment files older than KEEP_DAYS."""
+    oldest = now - KEEP_DAYS * 86400
+    delete_archive_index_before(oldest)
+    if not os.path.isdir(ARCHIVE_DIR):
+        return
+    oldest_day = datetime.fromtimestamp(oldest, timezone.utc).strftime('%Y-%m-%d')
+    for name in os.listdir(ARCHIVE_DIR):
+        # Segment names start with their UTC day, so they sort by age
+        if name.endswith('.gz') and name[:10] < oldest_day:
+            os.remove(os.path.join(ARCHIVE_DIR, name))
+
+class FeedArchive:
+    """
+    Writer for one fetch run. add() appends bodies as they are downloaded
+    (safe to call from download threads); save() writes their index rows.
+    """
+
+    def __init__(self, enabled=ENABLED):
+        self.enabled = enabled
+        self.records = []
+        self.lock = threading.Lock()
+
+    def add(self, feed_url, url, headers, body, fetched_at):
+        if not self.enabled:
+            return
+        data = gzip.compress(body)
+        segment = segment_name(fetched_at)
+        try:
+            with self.lock:
+                os.makedirs(ARCHIVE_DIR, exist_ok=True)
+                with open(os.path.join(ARCHIVE_DIR, segment), 'ab') as f:
+                    offset = f.tell()
+                    f.write(data)
+                self.records.append({
+                    'feed_url': feed_url, 'fetched_at': fetched_at, 'url': url, 'headers': headers,
+                    'segment': segment, 'offset': offset, 'length': len(data), 'size': len(body),
+                })
+        except OSError as e:
+            print(f"    [WARN] Failed to archive {feed_url}: {e}")
+
+    def save(self):
+        if not self.enabled:
+            return
+        save_archive_index(self.records)
+        if self.records:
+            prune_archive(self.records[-1]['fetched_at'])
+        self.records = []
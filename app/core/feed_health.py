@@ -0,0 +1,69 @@
+"""
+Per-feed fetch statistics (latency, bytes, HTTP status, bozo flag, entry
+and new-article counts), kept in the feed_stats table of news_data.db, and
+the health verdicts the scheduler derives from them. Slow feeds are polled
+less often; dead feeds are skipped and only probed every DEAD_RETRY.
+
+    python -m app.core.feed_health      # Per-feed summary of recent fetches
+"""
+from statistics import median
+import config.settings as settings
+from app.core.news_db import load_feed_stats
+
+config = getattr(settings, 'NEWS_CONFIG', {}).get('feed_health', {})
+
+ENABLED = config.get('enabled', True)
+HISTORY = config.get('history', 10)                 # Most recent fetches considered per feed
+SLOW_SECONDS = config.get('slow_seconds', 8)        # Median latency that marks a feed slow
+FAILURE_LIMIT = config.get('failure_limit', 5)      # Consecutive failed fetches that mark a feed dead
+DEMOTE_FACTOR = config.get('demote_factor', 4)      # Slow feeds are polled this many times less often
+DEAD_RETRY = config.get('dead_retry_hours', 24) * 3600    # Dead feeds are probed this often
+KEEP_DAYS = config.get('keep_days', 30)             # Stats rows kept in news_data.db
+MIN_SAMPLES = 3         # Fetches needed before latency counts
+
+SLOW = 'slow'
+DEAD = 'dead'
+
+def is_failure(row):
+    """A fetch that produced nothing usable: network error, HTTP error, or a broken feed with no entries."""
+    return bool(row['status'] is None or row['status'] >= 400 or (row['bozo'] and not row['entries']))
+
+def assess(history):
+    """SLOW, DEAD or None for one feed's recent fetches (newest first)."""
+    recent = history[:FAILURE_LIMIT]
+    if len(recent) >= FAILURE_LIMIT and all(is_failure(row) for row in recent):
+        return DEAD
+    latencies = [row['latency'] for row in history if row['latency'] is not None]
+    if len(latencies) >= MIN_SAMPLES and median(latencies) >= SLOW_SECONDS:
+        return SLOW
+    return None
+
+def load_feed_health(feed_urls=None):
+    """Returns {feed_url: SLOW | DEAD} for the feeds currently demoted."""
+    if not ENABLED:
+        return {}
+    health = {}
+    for feed_url, history in load_feed_stats(feed_urls, HISTORY).items():
+        state = assess(history)
+        if state:
+            health[feed_url] = state
+    return health
+
+def main():
+    histories = load_feed_stats(limit=HISTORY)
+    if not histories:
+        print("[*] No feed statistics recorded yet.")
+        return
+    print(f"{'state':<6} {'fetches':>7} {'failed':>6} {'latency':>8} {'KB':>7} {'entries':>7} {'new':>5}  feed")
+    for feed_url, history in sorted(histories.items()):
+        latencies = [row['latency'] for row in history if row['latency'] is not None]
+        print(
+            f"{assess(history) or 'ok':<6} {len(history):>7} {sum(map(is_failure, history)):>6} "
+            f"{median(latencies) if latencies else 0:>7.2f}s "
+            f"{sum(row['bytes'] or 0 for row in history) / len(history) / 1024:>7.1f} "
+            f"{sum(row['entries'] or 0 for row in history) / len(history):>7.1f} "
+            f"{sum(row['new_articles'] or 0 for row in history) / len(history):>5.1f}  {feed_url}"
+        )
+
+if __name__ == "__main__":
+    main()
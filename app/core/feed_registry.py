@@ -0,0 +1,147 @@
+"""
+Feed registry: every feed the pipeline polls, with a stable ID, kept in the
+feeds table of news_data.db. RSS_FEEDS from config/settings.py is registered
+automatically, and a feed removed from RSS_FEEDS is no longer polled. Larger
+subscription lists can be imported from OPML; those feeds stay until disabled:
+
+    python -m app.core.feed_registry --import-opml subscriptions.opml
+    python -m app.core.feed_registry --list
+    python -m app.core.feed_registry --disable https://example.com/feed.xml
+"""
+import argparse
+import bisect
+import hashlib
+import sqlite3
+import xml.etree.ElementTree as ET
+import config.settings as settings
+from app.core.news_db import get_news_db_connection, init_news_db
+
+VIRTUAL_NODES = 64   # Ring points per shard; more points = more even shards
+
+def feed_id_for(url):
+    """Stable feed ID derived from the feed URL."""
+    return hashlib.sha1(url.strip().encode('utf-8')).hexdigest()[:12]
+
+def _ring_hash(key):
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+class ConsistentHashRing:
+    """
+    Maps keys (feed hosts, see fetcher.py) to shards. Changing the shard count only moves the feeds
+    whose ring segment changed owner (about 1/N of them), so each feed keeps
+    being fetched by the same shard from run to run.
+    """
+
+    def __init__(self, shards, virtual_nodes=VIRTUAL_NODES):
+        points = sorted(
+            (_ring_hash(f"shard-{shard}:{node}"), shard)
+            for shard in range(shards) for node in range(virtual_nodes)
+        )
+        self.hashes = [point for point, _ in points]
+        self.shards = [shard for _, shard in points]
+
+    def shard_for(self, key):
+        position = bisect.bisect(self.hashes, _ring_hash(key)) % len(self.hashes)
+        return self.shards[position]
+
+CONFIG = 'config'
+OPML = 'opml'
+
+def register_feeds(feeds, source=CONFIG):
+    """
+    Registers (url, title) pairs not yet in the registry. Returns the number added.
+    OPML imports also take over matching config feeds, which then stay
+    registered when removed from RSS_FEEDS. A registered feed keeps its title,
+    since the title is its source name and stored data is keyed by it.
+    """
+    init_news_db()
+    conn = get_news_db_connection()
+    try:
+        rows = [(feed_id_for(url), url.strip(), title, source) for url, title in feeds]
+        known = {row[0] for row in conn.execute("SELECT feed_id FROM feeds")}
+        if source == OPML:
+            conn.executemany('''
+                INSERT INTO feeds (feed_id, url, title, source) VALUES (?, ?, ?, ?)
+                ON CONFLICT(feed_id) DO UPDATE SET source = excluded.source
+            ''', rows)
+        else:
+            conn.executemany("INSERT OR IGNORE INTO feeds (feed_id, url, title, source) VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+        return len({row[0] for row in rows} - known)
+    finally:
+        conn.close()
+
+def load_opml(path):
+    """Returns (xmlUrl, title) for every feed outline in an OPML file, nested folders included."""
+    tree = ET.parse(path)
+    feeds = []
+    for outline in tree.iter('outline'):
+        url = outline.get('xmlUrl')
+        if url:
+            feeds.append((url, outline.get('title') or outline.get('text')))
+    return feeds
+
+def import_opml(path):
+    feeds = load_opml(path)
+    added = register_feeds(feeds, OPML)
+    print(f"[*] Imported {path}: {len(feeds)} feeds, {added} new.")
+    return added
+
+def get_registry_feeds(config_feeds=()):
+    """
+    Registers config_feeds (RSS_FEEDS) and returns the enabled feeds to poll as
+    dicts (feed_id, url, title, source): config_feeds first in their listed
+    order, then OPML feeds in registration order. Config feeds no longer in
+    config_feeds are left out.
+    """
+    register_feeds([(url, None) for url in config_feeds])
+    conn = get_news_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT feed_id, url, title, source FROM feeds WHERE enabled = 1 ORDER BY rowid"
+        ).fetchall()
+    finally:
+        conn.close()
+    position = {feed_id_for(url): index for index, url in enumerate(config_feeds)}
+    feeds = [
+        dict(zip(('feed_id', 'url', 'title', 'source'), row)) for row in rows
+        if row[3] == OPML or row[0] in position
+    ]
+    return sorted(feeds, key=lambda feed: position.get(feed['feed_id'], len(position)))
+
+def set_enabled(url_or_id, enabled):
+    init_news_db()
+    conn = get_news_db_connection()
+    try:
+        cursor = conn.execute(
+            "UPDATE feeds SET enabled = ? WHERE url = ? OR feed_id = ?",
+            (1 if enabled else 0, url_or_id, url_or_id)
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="News feed registry")
+    parser.add_argument('--import-opml', metavar='PATH', help="Register every feed in an OPML file")
+    parser.add_argument('--list', action='store_true', help="List enabled feeds")
+    parser.add_argument('--disable', metavar='URL_OR_ID', help="Stop polling a feed")
+    parser.add_argument('--enable', metavar='URL_OR_ID', help="Resume polling a feed")
+    args = parser.parse_args()
+
+    try:
+        if args.import_opml:
+            import_opml(args.import_opml)
+        if args.disable:
+            print(f"[*] Disabled {set_enabled(args.disable, False)} feed(s).")
+        if args.enable:
+            print(f"[*] Enabled {set_enabled(args.enable, True)} feed(s).")
+        if args.list:
+            for feed in get_registry_feeds(getattr(settings, 'RSS_FEEDS', [])):
+                print(f"{feed['feed_id']}  {feed['source']:<6}  {feed['url']}  {feed['title'] or ''}")
+    except (OSError, ET.ParseError, sqlite3.Error) as e:
+        print(f"[ERR] {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import random
+import time
+from statistics import median
+import config.settings as settings
+from app.core.feed_health import DEAD, DEAD_RETRY, DEMOTE_FACTOR, SLOW
+
+config = getattr(settings, 'NEWS_CONFIG', {}).get('schedule', {})
+
+ENABLED = config.get('enabled', True)
+MIN_INTERVAL = config.get('min_interval_minutes', 15) * 60      # Never poll a feed more often
+MAX_STALENESS = config.get('max_staleness_hours', 12) * 3600    # Never serve a feed from cache for longer
+JITTER = config.get('jitter', 0.1)                              # +/- fraction applied to each next-due time
+POLL_FACTOR = 0.5       # Poll about twice per typical gap between entries
+CADENCE_ENTRIES = 20    # Most recent entry timestamps used to learn the cadence
+MIN_GAPS = 2            # Gaps needed before a learned cadence replaces the previous one
+
+def entry_times(articles, previous=()):
+    """
+    Newest CADENCE_ENTRIES distinct entry timestamps (Unix time, newest first)
+    of this fetch merged with those remembered from earlier fetches, so a
+    feed whose window holds a single entry still accumulates a history.
+    """
+    stamps = {a['published'].timestamp() for a in articles if a.get('published')}
+    stamps.update(previous)
+    return sorted(stamps, reverse=True)[:CADENCE_ENTRIES]
+
+def publish_interval(stamps):
+    """Median gap (seconds) between entry timestamps (newest first), or None with fewer than MIN_GAPS gaps."""
+    gaps = [newer - older for newer, older in zip(stamps, stamps[1:])]
+    gaps = [gap for gap in gaps if gap > 0]
+    return median(gaps) if len(gaps) >= MIN_GAPS else None
+
+class FeedScheduler:
+    """
+    Decides which feeds are due this run. Each feed's poll interval is learned
+    from the timestamps of its recent entries, kept across fetches in
+    feed_schedule (about half the typical gap between posts, clamped to
+    [MIN_INTERVAL, MAX_STALENESS]), and the next-due time
+    is jittered so feeds sharing a cadence do not all fall due together.
+
+    health ({feed_url: SLOW | DEAD}, see feed_health.py) demotes feeds: slow
+    ones are polled DEMOTE_FACTOR times less often, dead ones only every
+    DEAD_RETRY.
+    """
+
+    def __init__(self, schedule, now=None, enabled=ENABLED, health=None):
+        self.schedule = schedule
+        self.now = now or time.time()
+        self.enabled = enabled
+        self.health = health or {}
+        self.updated = {}
+
+    def is_dead(self, feed_url):
+        return self.health.get(feed_url) == DEAD
+
+    def max_staleness(self, feed_url):
+        return DEAD_RETRY if self.is_dead(feed_url) else MAX_STALENESS
+
+    def is_due(self, feed_url):
+        if not self.enabled:
+            return True
+        entry = self.schedule.get(feed_url)
+        if not entry:
+            return True
+        if self.is_dead(feed_url):
+            return self.now - entry['last_fetched'] >= DEAD_RETRY
+        return self.now >= entry['next_due'] or self.now - entry['last_fetched'] >= MAX_STALENESS
+
+    def interval_for(self, feed_url, articles, stamps=None):
+        if self.is_dead(feed_url) and not articles:
+            return DEAD_RETRY
+        previous = self.schedule.get(feed_url)
+        if stamps is None:
+            stamps = entry_times(articles, previous.get('entry_times') or [] if previous else [])
+        learned = publish_interval(stamps)
+        if learned is None:
+            interval = previous['interval'] if previous else MIN_INTERVAL
+        else:
+            interval = min(max(learned * POLL_FACTOR, MIN_INTERVAL), MAX_STALENESS)
+        if self.health.get(feed_url) == SLOW:
+            interval = min(interval * DEMOTE_FACTOR, MAX_STALENESS)
+        return interval
+
+    def record_fetch(self, feed_url, articles):
+        """Stores when the feed was polled, its recent entry timestamps and when it is next due."""
+        previous = self.schedule.get(feed_url)
+        stamps = entry_times(articles, previous.get('entry_times') or [] if previous else [])
+        interval = self.interval_for(feed_url, articles, stamps)
+        jittered = interval * (1 + random.uniform(-JITTER, JITTER))
+        self.updated[feed_url] = {
+            'interval': interval,
+            'last_fetched': self.now,
+            'next_due': self.now + min(jittered, self.max_staleness(feed_url)),
+            'entry_times': stamps,
+        }
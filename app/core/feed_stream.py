@@ -0,0 +1,127 @@
+"""
+Streaming RSS/Atom parser. Walks the XML incrementally and drops entries
+older than the requested window as soon as their date is read, so stale
+entries of archive-style feeds never become article rows. Anything it is
+not sure about raises UnsupportedFeed and the caller falls back to feedparser.
+"""
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+
+CHUNK_SIZE = 64 * 1024
+
+ENTRY_TAGS = {'item', 'entry'}
+ROOT_TAGS = {'rss', 'feed', 'RDF'}
+# Checked in order, like feedparser's published_parsed before updated_parsed
+PUBLISHED_TAGS = ('pubDate', 'published', 'issued', 'updated', 'date', 'modified')
+SUMMARY_TAGS = ('description', 'summary', 'content', 'encoded')
+# Media RSS (<media:content>, <media:description>, ...) describes attachments, not the entry
+MEDIA_NS = '{http://search.yahoo.com/mrss/}'
+UNSAFE_MARKUP = re.compile(r'<\s*(script|style|iframe|object|embed)\b', re.IGNORECASE)
+
+class UnsupportedFeed(Exception):
+    """Raised when a feed needs feedparser's full handling."""
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def parse_entry_date(text):
+    """
+    Parses an RFC 822 or ISO 8601 entry date into a naive UTC datetime, the
+    same representation fetcher.py derives from feedparser's parsed dates.
+    """
+    text = text.strip()
+    try:
+        if text[:4].isdigit():
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        else:
+            parsed = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        raise UnsupportedFeed(f"Unrecognized date: {text!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def entry_row(element, feed_url):
+    """(title, link, summary, published) for one <item>/<entry> element."""
+    fields = {}
+    link = None
+    guid_link = None
+    for child in element:
+        name = local_name(child.tag)
+        if name == 'guid':
+            # feedparser uses a permalink guid as the link when there is no <link>
+            guid = (child.text or '').strip()
+            if guid and child.get('isPermaLink', 'true') == 'true':
+                if not guid.startswith(('http://', 'https://')):
+                    # feedparser would use it as the link anyway: leave such feeds to it
+                    raise UnsupportedFeed(f"Non-URL permalink guid: {guid!r}")
+                guid_link = guid
+            continue
+        if name == 'link':
+            if child.get('href'):
+                if child.get('rel', 'alternate') == 'alternate' and link is None:
+                    link = child.get('href')
+            elif child.text and link is None:
+                link = child.text.strip()
+            continue
+        if child.tag.startswith(MEDIA_NS):
+            continue
+        if len(child):
+            if name == 'title' or name in SUMMARY_TAGS:
+                # Inline XHTML: leave it to feedparser
+                raise UnsupportedFeed(f"Nested markup in <{name}>")
+            continue
+        fields.setdefault(name, child.text or '')
+
+    published = None
+    for name in PUBLISHED_TAGS:
+        if fields.get(name, '').strip():
+            published = parse_entry_date(fields[name])
+            break
+    link = link or guid_link
+    summary = next((fields[name] for name in SUMMARY_TAGS if name in fields), '')
+    if UNSAFE_MARKUP.search(summary):
+        # feedparser's sanitizer strips these
+        raise UnsupportedFeed("Active content in summary")
+    return (
+        fields.get('title', 'N/A').strip() or 'N/A',
+        urljoin(feed_url, link) if link else 'N/A',
+        summary.strip(),
+        published,
+    )
+
+def stream_feed_rows(body, feed_url, cutoff=None):
+    """
+    Returns (title, link, summary, published) rows for the entries of an
+    RSS 2.0 / RSS 1.0 / Atom body, skipping entries published before cutoff
+    (an aware datetime). Raises UnsupportedFeed or ET.ParseError when the
+    feed should go through feedparser instead.
+    """
+    naive_cutoff = cutoff.astimezone(timezone.utc).replace(tzinfo=None) if cutoff else None
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    rows = []
+    seen_root = False
+    for start in range(0, len(body), CHUNK_SIZE):
+        parser.feed(body[start:start + CHUNK_SIZE])
+        for event, element in parser.read_events():
+            name = local_name(element.tag)
+            if event == 'start':
+                if not seen_root:
+                    if name not in ROOT_TAGS:
+                        raise UnsupportedFeed(f"Unknown root element <{name}>")
+                    seen_root = True
+                continue
+            if name not in ENTRY_TAGS:
+                continue
+            row = entry_row(element, feed_url)
+            if naive_cutoff is None or row[3] is None or row[3] >= naive_cutoff:
+                rows.append(row)
+            # Drop the parsed subtree right away
+            element.clear()
+    parser.close()
+    if not seen_root:
+        raise UnsupportedFeed("Empty document")
+    return rows
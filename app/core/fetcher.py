@@ -1,8 +1,45 @@
 # fetcher.py
+import sys
+import threading
+import time
 import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from urllib.parse import urlparse
-from datetime import datetime
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
 from time import mktime
+from app.core.article import Article
+from app.core.feed_stream import UnsupportedFeed, stream_feed_rows
+from app.core.feed_archive import REPLAY_SLACK, FeedArchive, read_body
+from app.core.feed_health import KEEP_DAYS as STATS_KEEP_DAYS, load_feed_health
+from app.core.feed_registry import ConsistentHashRing
+from app.core.feed_scheduler import FeedScheduler, ENABLED as SCHEDULER_ENABLED
+from app.core.news_db import (
+    load_archive_index, load_feed_cache, save_feed_cache, load_feed_schedule, save_feed_schedule, save_feed_stats
+)
+from app.core.parallel import get_process_pool, resolve_processes
+import config.settings as settings
+
+config = getattr(settings, 'NEWS_CONFIG', {}).get('fetch', {})
+
+# Concurrency limits for stage 1
+MAX_WORKERS = config.get('max_workers', 16)
+PER_HOST_LIMIT = config.get('per_host_limit', 2)
+REQUEST_TIMEOUT = config.get('timeout', 20)
+# Downloaded bodies allowed to wait for a parse process (0 = twice the process count)
+PARSE_BACKLOG = config.get('parse_backlog', 0)
+# Incremental XML parse with date cut-off; feedparser remains the fallback
+STREAMING_PARSER = config.get('streaming_parser', True)
+# Fetcher processes, each polling the feeds hashed to it with its own threads (1 = no sharding)
+SHARDS = config.get('shards', 1)
+
+# Use a common browser User-Agent to avoid being blocked (403 Forbidden)
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
 
 def get_source_name(feed_url):
     """Extracts a readable source name from the feed URL."""
@@ -13,66 +50,414 @@ def get_source_name(feed_url):
     except IndexError:
         return domain
 
-def fetch_feed(feed_url):
+def get_host_semaphore(url):
+    """Returns the shared semaphore capping concurrent requests to the URL's host."""
+    host = urlparse(url).netloc.lower()
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return _host_semaphores[host]
+
+def create_session(pool_size=MAX_WORKERS):
     """
-    Fetches and parses a single RSS/Atom feed.
-    Returns a list of article dictionaries.
+    Creates a requests session with pooled keep-alive connections.
+    Each host keeps at most PER_HOST_LIMIT open connections.
+    """
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=max(pool_size, 1), pool_maxsize=PER_HOST_LIMIT)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def parse_feed_rows(body, feed_url, headers=None, cutoff=None):
+    """
+    Parses a raw RSS/Atom body (bytes) into (source_name, rows, bozo) with one
+    (title, link, summary, published) tuple per entry. Plain tuples keep the
+    transfer cheap when this runs in a parse process. bozo is feedparser's
+    malformed-feed flag (always False when the streaming parser succeeds).
+
+    Entries published before cutoff (an aware datetime) are dropped. The
+    streaming parser skips them while reading; malformed or unusual feeds
+    fall back to feedparser.
+    """
+    if STREAMING_PARSER:
+        try:
+            return get_source_name(feed_url), stream_feed_rows(body, feed_url, cutoff), False
+        except (ET.ParseError, UnsupportedFeed, LookupError):
+            pass
+    rows, bozo = feedparser_rows(body, feed_url, headers)
+    if cutoff is not None:
+        naive_cutoff = cutoff.astimezone(timezone.utc).replace(tzinfo=None)
+        rows = [row for row in rows if row[3] is None or row[3] >= naive_cutoff]
+    return get_source_name(feed_url), rows, bozo
+
+def feedparser_rows(body, feed_url, headers=None):
+    """Full feedparser parse: handles malformed XML, encodings and sanitizing. Returns (rows, bozo)."""
+    response_headers = dict(headers or {})
+    response_headers.setdefault('content-location', feed_url)
+    feed = feedparser.parse(body, response_headers=response_headers)
+
+    if feed.bozo:
+        # Bozo error can sometimes be ignored if entries are still present
+        if not feed.entries:
+            print(f"    [WARN] Potential feed format issue: {feed_url}, Bozo Error: {feed.bozo_exception}")
+        else:
+            pass # Many feeds have minor XML errors but work fine
+
+    rows = []
+    for entry in feed.entries:
+        published_dt = None
+        if hasattr(entry, 'published_parsed') and entry.published_parsed:
+            published_dt = datetime.fromtimestamp(mktime(entry.published_parsed))
+        elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
+            published_dt = datetime.fromtimestamp(mktime(entry.updated_parsed))
+
+        summary = entry.get('summary', entry.get('description', ''))
+        rows.append((entry.get('title', 'N/A'), entry.get('link', 'N/A'), summary, published_dt))
+    return rows, bool(feed.bozo)
+
+def articles_from_rows(parsed):
+    source_name, rows, _ = parsed
+    return [
+        Article(title=title, link=link, summary=summary, published=published, source_name=source_name)
+        for title, link, summary, published in rows
+    ]
+
+def parse_feed(body, feed_url, headers=None, cutoff=None):
+    """
+    Parses a raw RSS/Atom body (bytes) into a list of Article records.
+    """
+    return articles_from_rows(parse_feed_rows(body, feed_url, headers, cutoff))
+
+def record_stats(stats, feed_url, **values):
+    """Adds values to the feed's fetch stats for this run (see feed_health.py)."""
+    if stats is not None:
+        stats.setdefault(feed_url, {}).update(values)
+
+class FeedDownload:
+    """Raw body of a feed that still needs parsing, plus its response validators."""
+
+    def __init__(self, feed_url, body, url, headers, cutoff=None):
+        self.feed_url = feed_url
+        self.cutoff = cutoff
+        self.body = body
+        self.url = url
+        # Plain dict for pickling; validators read while the lookup is still case-insensitive
+        self.headers = dict(headers)
+        self.etag = headers.get('ETag')
+        self.last_modified = headers.get('Last-Modified')
+
+def covers_cutoff(cached, cutoff):
+    """True if the cached entries were parsed with a cut-off no later than this run's."""
+    cached_cutoff = cached.get('cutoff')
+    return cached_cutoff is None or (cutoff is not None and cached_cutoff <= cutoff)
+
+def download_feed(feed_url, session=None, cache=None, cutoff=None, stats=None, archive=None):
+    """
+    Network half of fetch_feed. Returns a FeedDownload for a fresh body, or a
+    ready article list (cached entries on 304, empty on errors).
+    Status, latency and size are recorded into the stats dict, if given;
+    fresh bodies are appended to the FeedArchive, if given.
     """
     print(f"  - Fetching: {feed_url}")
+    session = session or create_session(pool_size=1)
+    started = None
+    cached = cache.get(feed_url) if cache is not None else None
+    if cached and not covers_cutoff(cached, cutoff):
+        # Cached entries were cut off at a later date than this run needs: fetch in full
+        cached = None
     try:
-        # Use a common browser User-Agent to avoid being blocked (403 Forbidden)
-        user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        
-        feed = feedparser.parse(feed_url, agent=user_agent)
-        
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        # Download the raw body over the pooled session, at most PER_HOST_LIMIT per host
+        with get_host_semaphore(feed_url):
+            started = time.monotonic()
+            response = session.get(feed_url, headers=headers, timeout=REQUEST_TIMEOUT)
+        record_stats(stats, feed_url, status=response.status_code, latency=time.monotonic() - started,
+                     bytes=len(response.content))
+
+        if response.status_code == 304 and cached:
+            print(f"    => Not modified, reusing {len(cached['articles'])} cached articles from {feed_url}")
+            record_stats(stats, feed_url, bozo=False, entries=len(cached['articles']), new_articles=0)
+            return [article.copy() for article in cached['articles']]
+
         # Check for HTTP errors (like 403)
-        status = getattr(feed, 'status', None)
-        if status and status >= 400:
-            print(f"    [ERR] HTTP Error {status}: {feed_url}")
+        if response.status_code >= 400:
+            print(f"    [ERR] HTTP Error {response.status_code}: {feed_url}")
             return []
 
-        if feed.bozo:
-            # Bozo error can sometimes be ignored if entries are still present
-            if not feed.entries:
-                print(f"    [WARN] Potential feed format issue: {feed_url}, Bozo Error: {feed.bozo_exception}")
-            else:
-                pass # Many feeds have minor XML errors but work fine
-
-        source_name = get_source_name(feed_url)
-        articles = []
-        
-        for entry in feed.entries:
-            published_dt = None
-            if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                published_dt = datetime.fromtimestamp(mktime(entry.published_parsed))
-            elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                published_dt = datetime.fromtimestamp(mktime(entry.updated_parsed))
-
-            summary = entry.get('summary', entry.get('description', ''))
-
-            articles.append({
-                'title': entry.get('title', 'N/A'),
-                'link': entry.get('link', 'N/A'),
-                'summary': summary,
-                'published': published_dt,
-                'source_name': source_name,
-            })
-            
-        print(f"    => Successfully fetched {len(articles)} articles.")
-        return articles
-        
+        if archive is not None:
+            archive.add(feed_url, response.url or feed_url, dict(response.headers), response.content, time.time())
+        return FeedDownload(feed_url, response.content, response.url or feed_url, response.headers, cutoff)
+
     except Exception as e:
         print(f"    [ERR] Fetch failed: {feed_url}, Error: {e}")
+        # Timeouts count with their full wait, so hanging hosts show up as slow
+        record_stats(stats, feed_url, status=None, latency=time.monotonic() - started if started else None,
+                     error=str(e)[:500])
         return []
 
-def fetch_all_feeds(feed_urls):
+def finish_feed(download, articles, cache=None, stats=None, bozo=False):
     """
-    Fetches all RSS feeds in the list and returns a consolidated article list.
+    Stores the parsed articles (and fresh validators, if any) and reports the feed as done.
+    Feeds without validators are cached too, so the scheduler can serve them when not due.
+    """
+    previous = cache.get(download.feed_url) if cache is not None else None
+    known_links = {article['link'] for article in previous['articles']} if previous else set()
+    record_stats(stats, download.feed_url, bozo=bozo, entries=len(articles),
+                 new_articles=sum(1 for article in articles if article['link'] not in known_links))
+    if cache is not None:
+        # Snapshot the parsed fields: the cache is saved after downstream stages have
+        # filled in (and, with --full-text, replaced summaries of) the returned articles
+        cache[download.feed_url] = {
+            'etag': download.etag, 'last_modified': download.last_modified,
+            'articles': [Article.from_dict(article.feed_dict()) for article in articles], 'cutoff': download.cutoff,
+        }
+    print(f"    => Successfully fetched {len(articles)} articles from {download.feed_url}")
+    return articles
+
+def fetch_feed(feed_url, session=None, cache=None, cutoff=None, stats=None, archive=None):
+    """
+    Fetches and parses a single RSS/Atom feed.
+    Returns a list of Article records.
+
+    When a validator cache dict is given, a conditional GET is sent and a
+    304 response returns the cached entries without re-parsing. Fresh
+    validators are written back into the cache dict.
+    Entries published before cutoff are skipped at parse time.
+    """
+    result = download_feed(feed_url, session, cache, cutoff, stats, archive)
+    if not isinstance(result, FeedDownload):
+        return result
+    try:
+        parsed = parse_feed_rows(result.body, result.url, result.headers, cutoff)
+        articles = articles_from_rows(parsed)
+    except Exception as e:
+        print(f"    [ERR] Parse failed: {feed_url}, Error: {e}")
+        record_stats(stats, feed_url, bozo=True, entries=0, new_articles=0, error=f"Parse failed: {e}"[:500])
+        return []
+    return finish_feed(result, articles, cache, stats, bozo=parsed[2])
+
+def iter_feeds(feed_urls, max_workers=MAX_WORKERS, processes=None, cutoff=None, use_schedule=True, shards=None,
+               replay=False, end_time=None, source_names=None):
+    """
+    Fetches feeds concurrently and yields (feed_index, articles) as each feed completes,
+    so downstream stages can start before the slowest feed has finished.
+
+    With shards > 1 the feed list is split by consistent hashing of feed hosts
+    (see feed_registry.py) across that many fetcher processes, each running
+    its own download threads; a feed stays on the same shard between runs.
+    Host semaphores are per process, so keeping each host on one shard keeps
+    PER_HOST_LIMIT a limit per host rather than per host and shard.
+    A shard's feeds are yielded together once the whole shard has finished.
+
+    replay=True reads the feed archive instead of the network (see iter_archived_feeds).
+
+    source_names ({feed_url: name}, e.g. registry titles) overrides the
+    URL-derived source name of each feed's articles.
+    """
+    shards = SHARDS if shards is None else shards
+    if replay:
+        fetched = iter_archived_feeds(feed_urls, cutoff, end_time)
+    elif shards > 1 and len(feed_urls) > 1:
+        fetched = _iter_feed_shards(feed_urls, max_workers, cutoff, use_schedule, shards)
+    else:
+        fetched = _iter_feeds_local(feed_urls, max_workers, processes, cutoff, use_schedule)
+    for index, articles in fetched:
+        name = source_names.get(feed_urls[index]) if source_names else None
+        if name:
+            name = sys.intern(name)
+            for article in articles:
+                article['source_name'] = name
+        yield index, articles
+
+def _fetch_shard(feed_urls, max_workers, cutoff, use_schedule):
+    """Runs in a shard process. Returns the articles of each feed, in feed_urls order."""
+    results = [[] for _ in feed_urls]
+    # Shard processes parse in their own threads rather than nesting process pools
+    for index, articles in _iter_feeds_local(feed_urls, max_workers, 0, cutoff, use_schedule):
+        results[index] = articles
+    return results
+
+def _iter_feed_shards(feed_urls, max_workers, cutoff, use_schedule, shards):
+    ring = ConsistentHashRing(shards)
+    assignments = {}
+    for index, url in enumerate(feed_urls):
+        assignments.setdefault(ring.shard_for(urlparse(url).netloc.lower()), []).append(index)
+    print(f"  - Fetching in {len(assignments)} shards: "
+          + ", ".join(str(len(indexes)) for _, indexes in sorted(assignments.items())) + " feeds")
+
+    per_shard_workers = max(1, max_workers // len(assignments))
+    with ProcessPoolExecutor(max_workers=len(assignments)) as executor:
+        futures = {
+            executor.submit(_fetch_shard, [feed_urls[i] for i in indexes], per_shard_workers, cutoff, use_schedule): indexes
+            for indexes in assignments.values()
+        }
+        for future in as_completed(futures):
+            indexes = futures[future]
+            try:
+                shard_results = future.result()
+            except Exception as e:
+                print(f"    [ERR] Fetch shard failed ({len(indexes)} feeds), Error: {e}")
+                shard_results = [[] for _ in indexes]
+            for index, articles in zip(indexes, shard_results):
+                yield index, articles
+
+def _iter_feeds_local(feed_urls, max_workers, processes, cutoff, use_schedule):
+    """
+    Fetches feeds in this process.
+
+    Feeds the scheduler (see feed_scheduler.py) does not consider due are
+    served from the feed cache without a request; use_schedule=False polls all.
+    Dead feeds (see feed_health.py) with nothing cached are skipped until
+    they are due for a probe. Each fetch's stats are appended to feed_stats.
+
+    With worker processes (see parallel.py), download threads only fetch raw
+    bodies and hand them to the process pool for parsing, so parsing is not
+    serialized on one core. At most PARSE_BACKLOG bodies wait for a parser;
+    beyond that, download threads block until one is picked up.
+    """
+    cache = load_feed_cache(feed_urls)
+    previous = dict(cache)
+    scheduler = FeedScheduler(load_feed_schedule(), enabled=SCHEDULER_ENABLED and use_schedule,
+                              health=load_feed_health(feed_urls))
+    stats = {}
+    archive = FeedArchive()
+
+    jobs = []
+    for index, url in enumerate(feed_urls):
+        cached = cache.get(url)
+        if scheduler.is_due(url):
+            jobs.append((index, url))
+        elif cached and covers_cutoff(cached, cutoff):
+            print(f"  - Not due yet, serving {len(cached['articles'])} cached articles: {url}")
+            yield index, [article.copy() for article in cached['articles']]
+        elif scheduler.is_dead(url):
+            print(f"  - Skipping dead feed until its next probe: {url}")
+            yield index, []
+        else:
+            jobs.append((index, url))
+    if len(jobs) < len(feed_urls):
+        print(f"  => {len(feed_urls) - len(jobs)} feeds not due this run, polling {len(jobs)}.")
+
+    session = create_session(pool_size=len(jobs))
+    processes = resolve_processes(processes)
+    try:
+        if processes > 1:
+            fetched = _iter_feeds_with_parse_pool(jobs, max_workers, processes, session, cache, cutoff, stats, archive)
+        else:
+            fetched = _iter_feeds_in_threads(jobs, max_workers, session, cache, cutoff, stats, archive)
+        for index, articles in fetched:
+            scheduler.record_fetch(feed_urls[index], articles)
+            yield index, articles
+    finally:
+        session.close()
+        # Persist only the entries refreshed by a 200 response this run
+        save_feed_cache({url: entry for url, entry in cache.items() if entry is not previous.get(url)})
+        save_feed_schedule(scheduler.updated)
+        save_feed_stats(stats, scheduler.now, STATS_KEEP_DAYS)
+        archive.save()
+
+def iter_archived_feeds(feed_urls, cutoff=None, end_time=None):
+    """
+    Replay counterpart of iter_feeds: yields (feed_index, articles) parsed from
+    the raw bodies archived between cutoff and end_time (aware datetimes; None
+    = now) and the last one before cutoff, with no network access. Entries of all archived fetches of a feed
+    are merged; a link seen in several fetches keeps its newest version.
+    """
+    start = cutoff.timestamp() if cutoff else 0
+    end = (end_time.timestamp() if end_time else time.time()) + REPLAY_SLACK
+    index_by_feed = load_archive_index(feed_urls, start, end)
+    print(f"  - Replaying {sum(map(len, index_by_feed.values()))} archived fetches of {len(index_by_feed)} feeds")
+    for index, url in enumerate(feed_urls):
+        articles = {}
+        for record in index_by_feed.get(url, []):
+            try:
+                parsed = parse_feed_rows(read_body(record), record['url'], record['headers'], cutoff)
+            except Exception as e:
+                print(f"    [ERR] Replay failed: {url} ({record['segment']}), Error: {e}")
+                continue
+            for article in articles_from_rows(parsed):
+                articles.setdefault(article['link'], article)
+        yield index, list(articles.values())
+
+def _iter_feeds_in_threads(jobs, max_workers, session, cache, cutoff=None, stats=None, archive=None):
+    if max_workers <= 1:
+        for index, url in jobs:
+            yield index, fetch_feed(url, session, cache, cutoff, stats, archive)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_feed, url, session, cache, cutoff, stats, archive): index for index, url in jobs
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def _iter_feeds_with_parse_pool(jobs, max_workers, processes, session, cache, cutoff=None, stats=None, archive=None):
+    pool = get_process_pool(processes)
+    parse_slots = threading.BoundedSemaphore(PARSE_BACKLOG or 2 * processes)
+
+    def download_and_submit(url):
+        result = download_feed(url, session, cache, cutoff, stats, archive)
+        if not isinstance(result, FeedDownload):
+            return result
+        # Backpressure: wait for a free parse slot before queueing another body
+        parse_slots.acquire()
+        try:
+            future = pool.submit(parse_feed_rows, result.body, result.url, result.headers, cutoff)
+        except Exception:
+            parse_slots.release()
+            raise
+        future.add_done_callback(lambda _: parse_slots.release())
+        return result, future
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        pending = {executor.submit(download_and_submit, url): (index, None) for index, url in jobs}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, download = pending.pop(future)
+                if download is None:
+                    result = future.result()
+                    if isinstance(result, tuple):
+                        # Body handed to a parser; wait for the parse future next
+                        pending[result[1]] = (index, result[0])
+                        continue
+                    yield index, result
+                    continue
+                try:
+                    parsed = future.result()
+                    articles = articles_from_rows(parsed)
+                except Exception as e:
+                    print(f"    [ERR] Parse failed: {download.feed_url}, Error: {e}")
+                    record_stats(stats, download.feed_url, bozo=True, entries=0, new_articles=0,
+                                 error=f"Parse failed: {e}"[:500])
+                    yield index, []
+                    continue
+                yield index, finish_feed(download, articles, cache, stats, bozo=parsed[2])
+
+def fetch_all_feeds(feed_urls, max_workers=MAX_WORKERS, processes=None, cutoff=None, use_schedule=True, shards=None,
+                    replay=False, end_time=None, source_names=None):
+    """
+    Fetches all RSS feeds in the list concurrently and returns a consolidated article list.
+    Articles are returned in feed-list order regardless of completion order.
+    Entries published before cutoff (an aware datetime) are skipped at parse time.
+    replay=True reads the feed archive up to end_time instead of the network.
     """
     all_articles = []
-    print("\n[Stage 1/5] Starting RSS feed aggregation...")
-    for url in feed_urls:
-        articles_from_feed = fetch_feed(url)
+    print(f"\n[Stage 1/5] Starting RSS feed aggregation ({len(feed_urls)} feeds, {max_workers} workers)...")
+    results = [None] * len(feed_urls)
+    for index, articles_from_feed in iter_feeds(feed_urls, max_workers, processes, cutoff, use_schedule, shards,
+                                                replay, end_time, source_names):
+        results[index] = articles_from_feed
+
+    for articles_from_feed in results:
         if articles_from_feed:
             all_articles.extend(articles_from_feed)
     print(f"[Stage 1/5] Complete! Total articles aggregated: {len(all_articles)}")
@@ -0,0 +1,63 @@
+import os
+import re
+import threading
+
+def keyword_pattern(keyword, whole_word_short=True):
+    """
+    Regex fragment for one keyword, matched against lowercased text.
+    Very short English alphanumeric keywords (e.g. 'AI', 'AR') use whole-word
+    matching when whole_word_short is set; Chinese or longer terms are substrings.
+    """
+    kw_lower = keyword.lower()
+    # Note: isascii() ensures this doesn't kill Chinese keyword matching.
+    if whole_word_short and len(kw_lower) <= 3 and kw_lower.isalnum() and kw_lower.isascii():
+        return rf'\b{re.escape(kw_lower)}\b'
+    return re.escape(kw_lower)
+
+def compile_keywords(keywords, whole_word_short=True):
+    """Compiles a keyword list into one alternation regex (None if the list is empty)."""
+    if not keywords:
+        return None
+    # Sorted so the compiled pattern is deterministic
+    fragments = sorted({keyword_pattern(kw, whole_word_short) for kw in keywords}, key=lambda fragment: (-len(fragment), fragment))
+    return re.compile('|'.join(fragments))
+
+class CategoryMatcher:
+    """
+    Compiled category keyword matcher: one combined regex per category, kept
+    in categories.json order so the first matching category still wins.
+    Recompiled only when the categories.json mtime changes.
+    """
+
+    def __init__(self, config_path, loader):
+        self.config_path = config_path
+        self.loader = loader
+        self.mtime = None
+        self.patterns = []
+        self.has_categories = False
+        self.lock = threading.Lock()
+
+    def get_patterns(self):
+        """Returns [(category, compiled_regex)] excluding 'Others', refreshing on file change."""
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError:
+            mtime = None
+        with self.lock:
+            if mtime != self.mtime or mtime is None:
+                categories = self.loader()
+                self.patterns = [
+                    (category, compile_keywords(keywords))
+                    for category, keywords in categories.items()
+                    if category != "Others" and keywords
+                ]
+                self.has_categories = bool(categories)
+                self.mtime = mtime
+            return self.patterns
+
+    def match(self, text_lower):
+        """Returns the first category whose keywords occur in text_lower, or None."""
+        for category, pattern in self.get_patterns():
+            if pattern.search(text_lower):
+                return category
+        return None
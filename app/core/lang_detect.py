@@ -0,0 +1,125 @@
+import json
+import re
+import sqlite3
+from collections import Counter
+from app.core.news_db import get_news_db_connection, init_news_db
+
+# Script ranges checked in order; the first script covering enough letters wins
+SCRIPT_PATTERNS = [
+    ('ja', re.compile(r'[\u3040-\u30ff]')),   # Hiragana / Katakana (before Han)
+    ('ko', re.compile(r'[\uac00-\ud7af]')),   # Hangul
+    ('zh', re.compile(r'[\u4e00-\u9fff]')),   # CJK Unified Ideographs
+    ('ru', re.compile(r'[\u0400-\u04ff]')),   # Cyrillic
+    ('ar', re.compile(r'[\u0600-\u06ff]')),   # Arabic
+]
+LATIN_LETTER = re.compile(r'[A-Za-z\u00c0-\u024f]')
+WORD = re.compile(r"[a-z\u00e0-\u00ff']+")
+
+# Short, high-frequency function words per Latin-script language
+STOPWORDS = {
+    'en': {'the', 'of', 'and', 'to', 'in', 'is', 'for', 'on', 'with', 'that', 'by', 'as', 'at', 'from', 'his', 'her', 'has', 'are', 'was', 'after', 'over', 'its', 'it', 'be', 'will', 'this', 'an', 'says', 'new'},
+    'fr': {'le', 'la', 'les', 'des', 'du', 'de', 'et', 'un', 'une', 'est', 'pour', 'dans', 'sur', 'au', 'aux', 'avec', 'par', 'que', 'qui', 'pas', 'ce', 'son', 'sa', 'ses', 'plus', "l'", "d'", 'après', 'être', 'été'},
+    'de': {'der', 'die', 'das', 'und', 'ist', 'nicht', 'mit', 'den', 'von', 'zu', 'im', 'auf', 'für', 'ein', 'eine', 'sich', 'auch', 'dem', 'des', 'bei', 'nach', 'wird'},
+    'es': {'el', 'los', 'las', 'del', 'y', 'en', 'que', 'por', 'con', 'para', 'una', 'es', 'al', 'lo', 'como', 'más', 'pero', 'sus', 'tras', 'sobre'},
+    'it': {'il', 'della', 'di', 'che', 'è', 'per', 'con', 'gli', 'nel', 'alla', 'sono', 'del', 'dei', 'una', 'anche', 'più', 'dopo'},
+    'pt': {'o', 'os', 'da', 'do', 'das', 'dos', 'em', 'que', 'não', 'uma', 'com', 'para', 'por', 'ao', 'mais', 'são', 'após'},
+}
+
+# Letters that only (or mostly) appear in one Latin-script language
+HINT_LETTERS = {
+    'fr': set('éèêëàâçœîïôùû'),
+    'de': set('äöüß'),
+    'es': set('ñ¿¡áíóú'),
+    'pt': set('ãõ'),
+}
+
+# Per-source profile thresholds
+MIN_PROFILE_SAMPLES = 20
+MIN_PROFILE_SHARE = 0.9
+
+def normalize_language(code):
+    """'zh-CN' -> 'zh', 'en-US' -> 'en'."""
+    return (code or '').split('-')[0].split('_')[0].lower()
+
+def detect_language(text, min_letters=4):
+    """
+    Fast script + stopword language guess. Returns a base language code
+    ('en', 'fr', 'zh', ...) or None when the text is too short or ambiguous.
+    """
+    if not text:
+        return None
+    latin = len(LATIN_LETTER.findall(text))
+    for lang, pattern in SCRIPT_PATTERNS:
+        count = len(pattern.findall(text))
+        if count >= min_letters // 2 and count >= latin * 0.3:
+            return lang
+
+    if latin < min_letters:
+        return None
+    scores = Counter()
+    for word in WORD.findall(text.lower().replace('’', "'")):
+        for lang, stopwords in STOPWORDS.items():
+            if word in stopwords:
+                scores[lang] += 1
+    lowered = text.lower()
+    for lang, letters in HINT_LETTERS.items():
+        hits = sum(1 for c in lowered if c in letters)
+        if hits:
+            scores[lang] += min(hits, 2)
+    if not scores:
+        return None
+    (best, best_score), *rest = scores.most_common(2) + [(None, 0)]
+    # Require a clear winner; shared words like 'de' or 'en' alone are not enough
+    if best_score < 2 or best_score == rest[0][1]:
+        return None
+    return best
+
+class LanguageProfiles:
+    """
+    Learned per-source_name language histogram, persisted in news_data.db
+    so sources with a stable language skip detection ambiguity across runs.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.dirty = set()
+        init_news_db()
+        conn = get_news_db_connection()
+        try:
+            for source_name, counts_json in conn.execute("SELECT source_name, counts FROM source_language_profile"):
+                self.counts[source_name] = Counter(json.loads(counts_json))
+        except (sqlite3.Error, ValueError) as e:
+            print(f"[WARN] Failed to load language profiles: {e}")
+        finally:
+            conn.close()
+
+    def observe(self, source_name, lang):
+        self.counts.setdefault(source_name, Counter())[lang] += 1
+        self.dirty.add(source_name)
+
+    def dominant(self, source_name):
+        """Returns the source's language once it is well established, else None."""
+        counts = self.counts.get(source_name)
+        if not counts:
+            return None
+        total = sum(counts.values())
+        lang, count = counts.most_common(1)[0]
+        if total >= MIN_PROFILE_SAMPLES and count / total >= MIN_PROFILE_SHARE:
+            return lang
+        return None
+
+    def save(self):
+        if not self.dirty:
+            return
+        conn = get_news_db_connection()
+        try:
+            conn.executemany('''
+                INSERT OR REPLACE INTO source_language_profile (source_name, counts, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', [(name, json.dumps(self.counts[name])) for name in self.dirty])
+            conn.commit()
+            self.dirty.clear()
+        except sqlite3.Error as e:
+            print(f"[WARN] Failed to save language profiles: {e}")
+        finally:
+            conn.close()
@@ -0,0 +1,132 @@
+import re
+import zlib
+from collections import defaultdict
+import config.settings as settings
+
+config = getattr(settings, 'NEWS_CONFIG', {}).get('dedup', {})
+
+# Estimated Jaccard similarity of text shingles above which two stories are merged
+SIMILARITY = config.get('similarity', 0.5)
+# Same, for the title alone: catches copies whose feed summaries differ or are empty
+TITLE_SIMILARITY = config.get('title_only_similarity', 0.7)
+# MinHash signature length and LSH banding (NUM_PERM = BANDS * ROWS)
+NUM_PERM = 64
+BANDS = config.get('lsh_bands', 32)
+ROWS = NUM_PERM // BANDS
+
+SHINGLE_SIZE = 5        # Characters per shingle for space-separated scripts
+CJK_SHINGLE_SIZE = 2    # Characters per shingle for CJK text
+SUMMARY_WORDS = 50      # Summary words included in the signature text
+
+_HASH_BITS = 32
+_BIN_BITS = 6           # log2(NUM_PERM)
+_GOLDEN = 0x9E3779B1    # Multiplicative mix so crc32's linear bits spread across bins
+
+CJK_CHAR = re.compile(r'[\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af]')
+NON_WORD = re.compile(r'[^\w]+')
+
+def normalize_text(text):
+    """Lowercases and strips punctuation, collapsing runs of whitespace."""
+    return NON_WORD.sub(' ', (text or '').lower()).strip()
+
+def text_shingles(text):
+    """Character shingles of normalized text (shorter shingles for CJK)."""
+    normalized = normalize_text(text)
+    if CJK_CHAR.search(normalized):
+        normalized = normalized.replace(' ', '')
+        size = CJK_SHINGLE_SIZE
+    else:
+        size = SHINGLE_SIZE
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+def minhash_signature(shingles):
+    """
+    64-value one-permutation MinHash signature (None for an empty set).
+    Each shingle is hashed once (crc32, stable across runs) into one of 64 bins,
+    keeping the minimum per bin; empty bins borrow the next non-empty bin's
+    value (rotation densification) so every position is comparable.
+    """
+    if not shingles:
+        return None
+    bins = [None] * NUM_PERM
+    shift = _HASH_BITS - _BIN_BITS
+    value_mask = (1 << shift) - 1
+    for shingle in shingles:
+        h = (zlib.crc32(shingle.encode('utf-8')) * _GOLDEN) & 0xFFFFFFFF
+        index, value = h >> shift, h & value_mask
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+
+    # Walk backwards twice around the ring so every empty bin sees its next filled bin
+    signature = list(bins)
+    carry, distance = None, 0
+    for i in range(2 * NUM_PERM - 1, -1, -1):
+        index = i % NUM_PERM
+        if bins[index] is not None:
+            carry, distance = bins[index], 0
+        else:
+            distance += 1
+            if carry is not None and signature[index] is None:
+                signature[index] = carry + (distance << shift)
+    return tuple(signature)
+
+def estimate_similarity(sig_a, sig_b):
+    """Fraction of agreeing MinHash positions, an estimate of Jaccard similarity."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+def band_keys(signature):
+    """One hashable key per LSH band."""
+    return [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+def article_signature_text(article):
+    """Text a story is fingerprinted on: translated title plus the start of its summary."""
+    title = article.get('translated_title') or article.get('title') or ''
+    summary = article.get('translated_summary') or article.get('summary') or ''
+    return f"{title} {' '.join(summary.split()[:SUMMARY_WORDS])}"
+
+def article_title_text(article):
+    """Title-only fingerprint text, for copies whose summaries say little in common."""
+    return article.get('translated_title') or article.get('title') or ''
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index. Items sharing at least one band bucket become candidates,
+    which are then verified against the similarity threshold, so lookups cost
+    roughly O(bucket size) instead of a scan over every indexed item.
+    """
+
+    def __init__(self, threshold=SIMILARITY):
+        self.threshold = threshold
+        self.buckets = defaultdict(list)
+        self.signatures = []
+        self.items = []
+
+    def best_match(self, signature):
+        """Returns (item, estimated similarity) of the closest item above the threshold, or (None, 0.0)."""
+        if signature is None:
+            return None, 0.0
+        candidates = set()
+        for key in band_keys(signature):
+            candidates.update(self.buckets.get(key, ()))
+        best, best_score = None, 0.0
+        for index in candidates:
+            score = estimate_similarity(signature, self.signatures[index])
+            if score >= self.threshold and score > best_score:
+                best, best_score = self.items[index], score
+        return best, best_score
+
+    def query(self, signature):
+        """Returns the most similar indexed item above the threshold, or None."""
+        return self.best_match(signature)[0]
+
+    def add(self, signature, item):
+        if signature is None:
+            return
+        index = len(self.items)
+        self.items.append(item)
+        self.signatures.append(signature)
+        for key in band_keys(signature):
+            self.buckets[key].append(index)
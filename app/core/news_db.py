@@ -1,13 +1,20 @@
 
 import sqlite3
 import os
+import json
 from datetime import datetime
+from app.core.article import Article
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 DB_NAME = 'news_data.db'
 DB_PATH = os.path.join(DATA_DIR, DB_NAME)
 
+FEED_STATS_FIELDS = ('fetched_at', 'status', 'latency', 'bytes', 'bozo', 'entries', 'new_articles', 'error')
+
+# In-memory index of links already stored in news_articles (built once per process)
+_seen_links = None
+
 def get_news_db_connection():
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
@@ -28,19 +35,452 @@ def init_news_db():
             translated_summary TEXT,
             pub_date TEXT,
             category TEXT,
+            category_source TEXT,      -- 'keyword', 'model', 'fallback' or 'manual' (see category_model.py)
             source_name TEXT,
             source_link TEXT,
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    try:
+        # Added after the table was first released
+        cursor.execute("ALTER TABLE news_articles ADD COLUMN category_source TEXT")
+    except sqlite3.OperationalError:
+        pass
+
+    # Feed HTTP Cache Table (conditional GET validators + last parsed entries)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feed_http_cache (
+            feed_url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            articles TEXT,             -- JSON list of parsed articles from the last 200 response
+            cutoff TEXT,               -- Entries older than this were skipped at parse time (ISO, NULL = none)
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    try:
+        # Added after the table was first released
+        cursor.execute("ALTER TABLE feed_http_cache ADD COLUMN cutoff TEXT")
+    except sqlite3.OperationalError:
+        pass
+
+    # Feed Registry Table (every polled feed with a stable ID, see feed_registry.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feeds (
+            feed_id TEXT PRIMARY KEY,  -- Hash of the feed URL
+            url TEXT UNIQUE,
+            title TEXT,                -- From OPML, if imported; used as the source name
+            source TEXT DEFAULT 'config',  -- 'config' (RSS_FEEDS) or 'opml'
+            enabled INTEGER DEFAULT 1,
+            added_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    try:
+        # Added after the table was first released; only OPML imports set a title
+        cursor.execute("ALTER TABLE feeds ADD COLUMN source TEXT DEFAULT 'config'")
+        cursor.execute("UPDATE feeds SET source = 'opml' WHERE title IS NOT NULL")
+    except sqlite3.OperationalError:
+        pass
+
+    # Feed Stats Table (one row per fetch, see feed_health.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feed_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            feed_url TEXT,
+            fetched_at REAL,           -- Unix time
+            status INTEGER,            -- HTTP status, NULL on network errors
+            latency REAL,              -- Seconds until the response arrived
+            bytes INTEGER,
+            bozo INTEGER,              -- feedparser flagged the feed as malformed
+            entries INTEGER,
+            new_articles INTEGER,      -- Entries not in the feed's previous fetch
+            error TEXT
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_feed_stats_feed ON feed_stats (feed_url, fetched_at)")
+
+    # Feed Archive Index (raw bodies in data/feed_archive/, see feed_archive.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feed_archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            feed_url TEXT,
+            fetched_at REAL,           -- Unix time
+            url TEXT,                  -- Final URL after redirects
+            headers TEXT,              -- JSON response headers (encoding detection on replay)
+            segment TEXT,              -- File name in data/feed_archive/
+            offset INTEGER,            -- Start of the gzip member in the segment
+            length INTEGER,            -- Compressed size
+            size INTEGER               -- Raw size
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_feed_archive_feed ON feed_archive (feed_url, fetched_at)")
+
+    # Article Text Cache (extracted page text by URL, see article_text.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_text_cache (
+            url TEXT PRIMARY KEY,
+            text TEXT,                 -- Empty when the page could not be fetched or parsed
+            fetched_at REAL            -- Unix time, for the TTL
+        )
+    ''')
+
+    # Feed Schedule Table (learned poll interval per feed, see feed_scheduler.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS feed_schedule (
+            feed_url TEXT PRIMARY KEY,
+            interval REAL,             -- Seconds between polls
+            last_fetched REAL,         -- Unix time
+            next_due REAL,             -- Unix time, jittered
+            entry_times TEXT           -- JSON list of recent entry timestamps (Unix time, newest first)
+        )
+    ''')
+    try:
+        # Added after the table was first released
+        cursor.execute("ALTER TABLE feed_schedule ADD COLUMN entry_times TEXT")
+    except sqlite3.OperationalError:
+        pass
+
+    # Translation Cache Table (content-addressed, see translation_cache.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS translation_cache (
+            text_hash TEXT,            -- SHA-1 of the source text
+            source_lang TEXT,
+            target_lang TEXT,
+            translated TEXT,
+            last_used REAL,            -- Unix time, drives LRU/age eviction
+            PRIMARY KEY (text_hash, source_lang, target_lang)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_translation_cache_last_used ON translation_cache (last_used)")
+
+    # Source Language Profile Table (learned per-source language histogram)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS source_language_profile (
+            source_name TEXT PRIMARY KEY,
+            counts TEXT,               -- JSON {lang: observations}
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Story Thread Tables (cross-day story index, see story_threads.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS story_threads (
+            thread_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,                -- Translated title of the thread's first article
+            centroid BLOB,             -- Per-position mode of recent member MinHash signatures
+            last_signature BLOB,       -- Signature of the most recent member
+            last_link TEXT,
+            article_count INTEGER,
+            first_seen REAL,           -- Unix time
+            last_seen REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS story_thread_members (
+            link TEXT PRIMARY KEY,
+            thread_id INTEGER,
+            signature BLOB,
+            seen_at REAL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_story_thread_members_thread ON story_thread_members (thread_id, seen_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_story_threads_last_seen ON story_threads (last_seen)")
     
     conn.commit()
     conn.close()
 
+def load_feed_cache(feed_urls=None):
+    """
+    Loads the per-feed validator store, optionally only for feed_urls.
+    Returns {feed_url: {'etag', 'last_modified', 'articles', 'cutoff'}}.
+    """
+    wanted = set(feed_urls) if feed_urls is not None else None
+    init_news_db()
+    conn = get_news_db_connection()
+    cursor = conn.cursor()
+    cache = {}
+    try:
+        cursor.execute("SELECT feed_url, etag, last_modified, articles, cutoff FROM feed_http_cache")
+        for feed_url, etag, last_modified, articles_json, cutoff in cursor.fetchall():
+            if wanted is not None and feed_url not in wanted:
+                continue
+            articles = []
+            for data in json.loads(articles_json) if articles_json else []:
+                if data.get('published'):
+                    data['published'] = datetime.fromisoformat(data['published'])
+                articles.append(Article.from_dict(data))
+            cache[feed_url] = {
+                'etag': etag, 'last_modified': last_modified, 'articles': articles,
+                'cutoff': datetime.fromisoformat(cutoff) if cutoff else None,
+            }
+    except (sqlite3.Error, ValueError) as e:
+        print(f"[WARN] Failed to load feed cache: {e}")
+    finally:
+        conn.close()
+    return cache
+
+def save_feed_cache(entries):
+    """
+    Persists updated validator entries ({feed_url: {'etag', 'last_modified', 'articles', 'cutoff'}}).
+    """
+    if not entries:
+        return
+
+    init_news_db()
+    conn = get_news_db_connection()
+    cursor = conn.cursor()
+    rows = []
+    for feed_url, entry in entries.items():
+        articles = [
+            {**article.feed_dict(), 'published': article['published'].isoformat() if article.get('published') else None}
+            for article in entry.get('articles', [])
+        ]
+        cutoff = entry['cutoff'].isoformat() if entry.get('cutoff') else None
+        rows.append((feed_url, entry.get('etag'), entry.get('last_modified'), json.dumps(articles, ensure_ascii=False), cutoff))
+    try:
+        cursor.executemany('''
+            INSERT OR REPLACE INTO feed_http_cache (feed_url, etag, last_modified, articles, cutoff, updated_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', rows)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"[WARN] Failed to save feed cache: {e}")
+    finally:
+        conn.close()
+
+def load_feed_schedule():
+    """Returns {feed_url: {'interval', 'last_fetched', 'next_due', 'entry_times'}}."""
+    init_news_db()
+    conn = get_news_db_connection()
+    schedule = {}
+    try:
+        for feed_url, interval, last_fetched, next_due, entry_times in conn.execute(
+            "SELECT feed_url, interval, last_fetched, next_due, entry_times FROM feed_schedule"
+        ):
+            schedule[feed_url] = {
+                'interval': interval, 'last_fetched': last_fetched, 'next_due': next_due,
+                'entry_times': json.loads(entry_times) if entry_times else [],
+            }
+    except (sqlite3.Error, ValueError) as e:
+        print(f"[WARN] Failed to load feed schedule: {e}")
+    finally:
+        conn.close()
+    return schedule
+
+def save_feed_schedule(entries):
+    """Persists updated schedule entries ({feed_url: {'interval', 'last_fetched', 'next_due', 'entry_times'}})."""
+    if not entries:
+        return
+    conn = get_news_db_connection()
+    try:
+        conn.executemany('''
+            INSERT OR REPLACE INTO feed_schedule (feed_url, interval, last_fetched, next_due, entry_times)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [
+            (url, entry['interval'], entry['last_fetched'], entry['next_due'], json.dumps(entry.get('entry_times') or []))
+            for url, entry in entries.items()
+        ])
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"[WARN] Failed to save feed schedule: {e}")
+    finally:
+        conn.close()
+
+def load_feed_stats(feed_urls=None, limit=10):
+    """Returns {feed_url: [fetch stats dicts, newest first]} with at most limit fetches per feed."""
+    init_news_db()
+    conn = get_news_db_connection()
+    wanted = set(feed_urls) if feed_urls is not None else None
+    stats = {}
+    try:
+        rows = conn.execute('''
+            SELECT feed_url, fetched_at, status, latency, bytes, bozo, entries, new_articles, error FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY feed_url ORDER BY fetched_at DESC) AS recency
+                FROM feed_stats
+            ) WHERE recency <= ? ORDER BY feed_url, fetched_at DESC
+        ''', (limit,))
+        for row in rows:
+            if wanted is not None and row[0] not in wanted:
+                continue
+            stats.setdefault(row[0], []).append(dict(zip(FEED_STATS_FIELDS, row[1:])))
+    except sqlite3.Error as e:
+        print(f"[WARN] Failed to load feed stats: {e}")
+    finally:
+        conn.close()
+    return stats
+
+def save_feed_stats(entries, fetched_at, keep_days=30):
+    """Appends this run's fetch stats ({feed_url: stats dict}) and drops rows older than keep_days."""
+    if not entries:
+        return
+    conn = get_news_db_connection()
+    try:
+        conn.executemany('''
+            INSERT INTO feed_stats (feed_url, fetched_at, status, latency, bytes, bozo, entries, new_articles, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (url, fetched_at, *(entry.get(field) for field in FEED_STATS_FIELDS[1:]))
+            for url, entry in entries.items()
+        ])
+        conn.execute("DELETE FROM feed_stats WHERE fetched_at < ?", (fetched_at - keep_days * 86400,))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"[WARN] Failed to save feed stats: {e}")
+    finally:
+        conn.close()
+
+def save_archive_index(records):
+    """Appends feed archive index rows (dicts as built by FeedArchive.add)."""
+    if not records:
+        return
+    conn = get_news_db_connection()
+    try:
+        conn.executemany('''
+            INSERT INTO feed_archive (feed_url, fetched_at, url, headers, segment, offset, length, size)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (r['feed_url'], r['fetched_at'], r['url'], json.dumps(r['headers']), r['segment'], r['offset'],
+             r['length'], r['size'])
+            for r in records
+        ])
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"[WARN] Failed to save feed archive index: {e}")
+    finally:
+        conn.close()
+
+def load_archive_index(feed_urls, start_time, end_time):
+    """
+    Returns {feed_url: [archive records, newest first]} fetched between
+    start_time and end_time (Unix), plus each feed's last record before
+    start_time: 304 responses and cache-served runs archive no new body.
+    """
+    init_news_db()
+    conn = get_news_db_connection()
+    wanted = set(feed_urls)
+    index = {}
+    try:
+        rows = conn.execute('''
+            SELECT feed_url, fetched_at, url, headers, segment, offset, length FROM feed_archive
+            WHERE fetched_at <= ? AND (
+                fetched_at >= ? OR id IN (SELECT MAX(id) FROM feed_archive WHERE fetched_at < ? GROUP BY feed_url)
+            )
+            ORDER BY fetched_at DESC, id DESC
+        ''', (end_time, start_time, start_time))
+        for feed_url, fetched_at, url, headers, segment, offset, length in rows:
+            if feed_url not in wanted:
+                continue
+            index.setdefault(feed_url, []).append({
+                'feed_url': feed_url, 'fetched_at': fetched_at, 'url': url, 'headers': json.loads(headers or '{}'),
+                'segment': segment, 'offset': offset, 'length': length,
+            })
+    except sqlite3.Error as e:
+        print(f"[WARN] Failed to load feed archive index: {e}")
+    finally:
+        conn.close()
+    return index
+
+def delete_archive_index_before(fetched_at):
+    conn = get_news_db_connection()
+    try:
+        conn.execute("DELETE FROM feed_archive WHERE fetched_at < ?", (fetched_at,))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"[WARN] Failed to prune feed archive index: {e}")
+    finally:
+        conn.close()
+
+def load_article_texts(urls, fresh_after):
+    """Returns {url: text} for cached article texts fetched after fresh_after (Unix time)."""
+    init_news_db()
+    conn = get_news_db_connection()
+    texts = {}
+    try:
+        # Stay below SQLite's bound-parameter limit
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            for url, text in conn.execute(
+                f"SELECT url, text FROM article_text_cache WHERE fetched_at > ? AND url IN ({placeholders})",
+                [fresh_after, *chunk]
+            ):
+                texts[url] = text or ''
+    except sqlite3.Error as e:
+        print(f"[WARN] Failed to load article text cache: {e}")
+    finally:
+        conn.close()
+    return texts
+
+def save_article_texts(texts, fetched_at, expired_before=0):
+    """Stores extracted texts ({url: text}) and drops entries fetched before expired_before."""
+    if not texts:
+        return
+    conn = get_news_db_connection()
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO article_text_cache (url, text, fetched_at) VALUES (?, ?, ?)",
+            [(url, text, fetched_at) for url, text in texts.items()]
+        )
+        conn.execute("DELETE FROM article_text_cache WHERE fetched_at < ?", (expired_before,))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"[WARN] Failed to save article text cache: {e}")
+    finally:
+        conn.close()
+
+def load_seen_links():
+    """Returns the set of article links already stored in news_articles."""
+    global _seen_links
+    if _seen_links is None:
+        init_news_db()
+        conn = get_news_db_connection()
+        try:
+            _seen_links = {row[0] for row in conn.execute("SELECT link FROM news_articles")}
+        finally:
+            conn.close()
+    return _seen_links
+
+def rehydrate_known_articles(articles, verbose=True):
+    """
+    Fills translated_title/translated_summary from the database for articles
+    whose link is already stored, so they skip the translation stage.
+    Returns the number of rehydrated articles.
+    """
+    seen_links = load_seen_links()
+    known = {article.get('link') for article in articles if article.get('link') in seen_links}
+    if not known:
+        return 0
+
+    conn = get_news_db_connection()
+    stored = {}
+    try:
+        links = list(known)
+        # Stay below SQLite's bound-parameter limit
+        for i in range(0, len(links), 500):
+            chunk = links[i:i + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            for link, translated_title, translated_summary in conn.execute(
+                f"SELECT link, translated_title, translated_summary FROM news_articles WHERE link IN ({placeholders})",
+                chunk
+            ):
+                if translated_title:
+                    stored[link] = (translated_title, translated_summary or '')
+    finally:
+        conn.close()
+
+    for article in articles:
+        if article.get('link') in stored:
+            article['translated_title'], article['translated_summary'] = stored[article['link']]
+
+    if verbose:
+        print(f"[*] Seen-link index: {len(stored)} of {len(articles)} articles already stored, reusing their translations.")
+    return len(stored)
+
 def save_news_articles(articles):
     """
     Saves new articles to the database.
-    Skips duplicates based on the link.
+    Skips duplicates based on the link, except that a stored article saved
+    without a translation (translation budget overflow) gets it filled in.
     """
     if not articles:
         return
@@ -58,9 +498,16 @@ def save_news_articles(articles):
         
         try:
             cursor.execute('''
-                INSERT OR IGNORE INTO news_articles 
-                (link, title, translated_title, summary, translated_summary, pub_date, category, source_name, source_link)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO news_articles 
+                (link, title, translated_title, summary, translated_summary, pub_date, category, category_source,
+                 source_name, source_link)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(link) DO UPDATE SET
+                    translated_title = excluded.translated_title,
+                    translated_summary = excluded.translated_summary,
+                    category = excluded.category,
+                    category_source = excluded.category_source
+                WHERE news_articles.translated_title IS NULL AND excluded.translated_title IS NOT NULL
             ''', (
                 article.get('link'),
                 article.get('title'),
@@ -69,11 +516,14 @@ def save_news_articles(articles):
                 article.get('translated_summary'),
                 article.get('pub_date'),
                 article.get('category', 'Others'),
+                article.get('category_source'),
                 source_name,
                 source_link
             ))
             if cursor.rowcount > 0:
                 saved_count += 1
+                if _seen_links is not None:
+                    _seen_links.add(article.get('link'))
         except sqlite3.Error as e:
             print(f"Error saving article {article.get('link')}: {e}")
             
@@ -0,0 +1,57 @@
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+import config.settings as settings
+
+config = getattr(settings, 'NEWS_CONFIG', {}).get('parallel', {})
+
+# Worker processes for CPU-heavy stages (0 = run serially, -1 = one per core)
+PROCESSES = config.get('processes', 0)
+# Smaller workloads stay serial: pickling and process start-up would dominate
+MIN_ITEMS = config.get('min_items', 2000)
+CHUNK_SIZE = config.get('chunk_size', 500)
+
+_pool = None
+_pool_size = 0
+
+def resolve_processes(processes=None):
+    """Turns the configured/requested count into a concrete number of processes."""
+    processes = PROCESSES if processes is None else processes
+    if processes < 0:
+        return os.cpu_count() or 1
+    return processes
+
+def get_process_pool(processes):
+    """Shared process pool, created on first use and reused by every stage."""
+    global _pool, _pool_size
+    if _pool is None or _pool_size != processes:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(max_workers=processes)
+        _pool_size = processes
+    return _pool
+
+@atexit.register
+def shutdown_process_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def map_chunks(func, items, processes=None, chunk_size=CHUNK_SIZE, min_items=MIN_ITEMS):
+    """
+    Applies func (a picklable function mapping a list to an equally long list
+    of results) to items in chunks across the process pool. Results come back
+    in input order, so the output is identical to func(items) run serially.
+    """
+    processes = resolve_processes(processes)
+    if processes <= 1 or len(items) < min_items:
+        return func(items)
+    results = []
+    for chunk_results in get_process_pool(processes).map(func, chunked(items, chunk_size)):
+        results.extend(chunk_results)
+    return results
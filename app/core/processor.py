@@ -1,14 +1,53 @@
 import json
 import os
 import re
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta, timezone
+from functools import partial
+from urllib.parse import urlparse, parse_qsl, urlencode
+import config.settings as settings
 from config.settings import BLOCKED_KEYWORDS, SHOW_IMAGES
+from app.core.keyword_matcher import CategoryMatcher, compile_keywords
+from app.core.parallel import map_chunks
+from app.core.category_model import (
+    FALLBACK, FALLBACK_CATEGORY, FALLBACK_SOURCES, KEYWORD, MODEL, classifier_text, get_category_model,
+)
+from app.core.near_duplicates import (
+    NearDuplicateIndex, SIMILARITY as NEAR_DUPLICATE_SIMILARITY, TITLE_SIMILARITY as NEAR_DUPLICATE_TITLE_SIMILARITY,
+    article_signature_text, article_title_text, minhash_signature, text_shingles,
+)
 from tqdm import tqdm
 
+config = getattr(settings, 'NEWS_CONFIG', {}).get('dedup', {})
+
+# Minimum Jaccard similarity of original-language title shingles for pre-translation clustering
+TITLE_SIMILARITY = config.get('title_similarity', 0.6)
+
+digest_config = getattr(settings, 'NEWS_CONFIG', {}).get('digest', {})
+
+# Translation budget: top-N stories per category (0 = translate everything)
+PER_CATEGORY_LIMIT = digest_config.get('per_category_limit', 0)
+# Categories whose stories are always translated
+PRIORITY_CATEGORIES = digest_config.get('priority_categories', [])
+
+# Query parameters that never change the article a URL points to
+TRACKING_PARAMS = ('utm_', 'at_', 'ref', 'fbclid', 'gclid', 'cmpid', 'smid', 'xtor')
+CJK_CHAR = re.compile(r'[\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af]')
+
+# Word budget of a rendered summary (renderer.py / unified_reporter.py)
+SUMMARY_WORD_LIMIT = 100
+# Source text kept for translation: the render budget plus slack for length changes
+RENDER_BUDGET_SLACK = 1.2
+# Rough CJK characters per rendered (translated) word
+CJK_CHARS_PER_WORD = 2.5
+SENTENCE_END = re.compile(r'[.!?](?=["\u201d\u2019)\]]?(\s|$))|[\u3002\uff01\uff1f\uff1b]')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CATEGORIES_PATH = os.path.join(BASE_DIR, 'config', 'categories.json')
+
 def load_categories():
     """Loads categorization keyword map from config/categories.json."""
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    config_path = os.path.join(base_dir, 'config', 'categories.json')
+    config_path = CATEGORIES_PATH
     
     if os.path.exists(config_path):
         try:
@@ -18,119 +57,229 @@ def load_categories():
             print(f"[WARN] Failed to load category config: {e}")
     return {}
 
-def apply_keyword_categorization(articles):
-    """Categorizes articles based on defined keywords with smart matching."""
-    print("\n[Stage 3.5/5] Categorizing articles based on keywords...")
-    categories = load_categories()
-    if not categories:
+# Compiled once per process; recompiled when categories.json changes
+category_matcher = CategoryMatcher(CATEGORIES_PATH, load_categories)
+# Blocklist is plain substring matching (no whole-word rule)
+blocked_pattern = compile_keywords(BLOCKED_KEYWORDS, whole_word_short=False)
+
+def article_category_text(article):
+    """Original and translated title + summary, lowercased, as matched by the categorizers."""
+    return classifier_text(
+        article.get('title'), article.get('summary'),
+        article.get('translated_title'), article.get('translated_summary')
+    )
+
+def fallback_category(article):
+    """Category for articles no keyword rule or model matched."""
+    # Special handling for specific sources (BBC, NYT)
+    if article.get('source_name') in FALLBACK_SOURCES:
+        return FALLBACK_CATEGORY
+    return "Others"
+
+def categorize_article(article):
+    """Returns the category for a single article using keyword rules."""
+    # Priority: Check keyword matches (first category in categories.json order wins)
+    category = category_matcher.match(article_category_text(article))
+    return category or fallback_category(article)
+
+def classify_unmatched(articles):
+    """
+    Second pass for articles no keyword rule matched: one batched call to the
+    TF-IDF category model (if trained), then the source fallback.
+    """
+    if not articles:
+        return
+    model = get_category_model()
+    predicted = [None] * len(articles)
+    if model is not None:
+        allowed = {category for category, _ in category_matcher.get_patterns()}
+        predicted = model.classify([article_category_text(a) for a in articles], allowed=allowed)
+    for article, category in zip(articles, predicted):
+        if category:
+            article['category'], article['category_source'] = category, MODEL
+        else:
+            article['category'], article['category_source'] = fallback_category(article), FALLBACK
+    matched = sum(1 for category in predicted if category)
+    if matched:
+        print(f"    => Category model placed {matched} of {len(articles)} keyword-unmatched articles.")
+
+def match_keyword_rows(texts):
+    """Keyword worker: first matching category (or None) per lowercased text."""
+    return [category_matcher.match(text) for text in texts]
+
+def assign_categories(articles, processes=None):
+    """
+    Keyword pass over all articles (sharded across the process pool for large
+    inputs), then one batched model pass over the unmatched ones.
+    """
+    category_matcher.get_patterns()
+    if not category_matcher.has_categories:
         for article in articles:
-            article['category'] = 'Others'
+            article['category'], article['category_source'] = 'Others', FALLBACK
         return articles
 
-    for article in tqdm(articles, desc="Categorizing"):
-        # Combine original and translated text for maximum matching coverage
-        original_text = f"{article.get('title', '')} {article.get('summary', '')}"
-        translated_text = f"{article.get('translated_title', '')} {article.get('translated_summary', '')}"
-        text_to_search = f"{original_text} {translated_text}".lower()
-        
-        assigned_category = "Others"
-        
-        # Priority: Check keyword matches
-        found_match = False
-        for category, keywords in categories.items():
-            if category == "Others": continue
-            
-            matched = False
-            for kw in keywords:
-                kw_lower = kw.lower()
-                
-                # Rule: For very short English alphanumeric keywords (e.g., 'AI', 'AR'), 
-                # use whole-word matching. 
-                # Note: We use isascii() to ensure this doesn't kill Chinese keyword matching.
-                if len(kw_lower) <= 3 and kw_lower.isalnum() and kw_lower.isascii():
-                    pattern = rf'\b{re.escape(kw_lower)}\b'
-                    if re.search(pattern, text_to_search):
-                        matched = True
-                        break
-                # Rule: Substring match for Chinese or longer English terms
-                else:
-                    if kw_lower in text_to_search:
-                        matched = True
-                        break
-            
-            if matched:
-                assigned_category = category
-                found_match = True
-                break
-        
-        # Secondary Logic: Special handling for specific sources (BBC, NYT)
-        if not found_match and article.get('source_name') in ['anyfeeder', 'nytimes']:
-            assigned_category = "Politics & International"
-
-        article['category'] = assigned_category
-    
+    texts = [article_category_text(article) for article in articles]
+    unmatched = []
+    for article, category in zip(articles, map_chunks(match_keyword_rows, texts, processes)):
+        if category:
+            article['category'], article['category_source'] = category, KEYWORD
+        else:
+            unmatched.append(article)
+    classify_unmatched(unmatched)
     return articles
 
-def filter_articles(articles, days=None, start_date=None, end_date=None):
+def apply_keyword_categorization(articles, processes=None):
+    """Categorizes articles based on defined keywords with smart matching."""
+    print("\n[Stage 3.5/5] Categorizing articles based on keywords...")
+    return assign_categories(articles, processes)
+
+def iter_categorize_articles(articles):
+    """
+    Streaming variant of apply_keyword_categorization. Keyword matches are
+    yielded immediately; unmatched articles are classified in one batch at the end.
+    """
+    category_matcher.get_patterns()
+    unmatched = []
+    for article in articles:
+        if not category_matcher.has_categories:
+            article['category'], article['category_source'] = 'Others', FALLBACK
+            yield article
+            continue
+        category = category_matcher.match(article_category_text(article))
+        if category:
+            article['category'], article['category_source'] = category, KEYWORD
+            yield article
+        else:
+            unmatched.append(article)
+    classify_unmatched(unmatched)
+    yield from unmatched
+
+def rank_key(article, feed_rank):
+    """Sort key: more sources first, then most recent, then feed priority."""
+    published = article.get('published')
+    timestamp = published.timestamp() if published else 0
+    return (-len(article.get('sources') or [None]), -timestamp, feed_rank.get(article.get('source_name'), len(feed_rank)))
+
+def select_for_translation(articles, per_category_limit=PER_CATEGORY_LIMIT, feed_rank=None,
+                           priority_categories=PRIORITY_CATEGORIES, processes=None):
+    """
+    Category-aware translation budget: categorizes on original text, ranks
+    stories per category and keeps the top N (plus every story in a priority
+    category). Returns (selected, overflow), both in their original order.
+    """
+    print(f"\n[Stage 2.75/5] Selecting top {per_category_limit} stories per category for translation...")
+    feed_rank = feed_rank or {}
+    by_category = defaultdict(list)
+    for article in assign_categories(articles, processes):
+        by_category[article['category']].append(article)
+
+    selected_ids = set()
+    for category, members in by_category.items():
+        if category in priority_categories:
+            chosen = members
+        else:
+            chosen = sorted(members, key=lambda a: rank_key(a, feed_rank))[:per_category_limit]
+        selected_ids.update(id(article) for article in chosen)
+
+    selected = [article for article in articles if id(article) in selected_ids]
+    overflow = [article for article in articles if id(article) not in selected_ids]
+    print(f"    => {len(selected)} stories selected, {len(overflow)} left untranslated.")
+    return selected, overflow
+
+def get_time_window(days=None, start_date=None, end_date=None):
+    """Returns the (start_time, end_time) window used for date filtering."""
+    if start_date and end_date:
+        return start_date, end_date
+    days_to_filter = days if days is not None else 1
+    end_time = datetime.now(timezone.utc)
+    return end_time - timedelta(days=days_to_filter), end_time
+
+def is_blocked(article):
+    """Checks title and summary against the blocklist."""
+    if blocked_pattern is None:
+        return False
+    return bool(blocked_pattern.search(article.get('title', '').lower())
+                or blocked_pattern.search(article.get('summary', '').lower()))
+
+def is_in_window(article, start_time, end_time):
+    """Articles without a publish date are always kept."""
+    published_time = article.get('published')
+    if not published_time:
+        return True
+    if published_time.tzinfo is None:
+        published_time = published_time.replace(tzinfo=timezone.utc)
+    return start_time <= published_time <= end_time
+
+def clean_summary(summary):
+    """Strips images and HTML tags from a summary for a plain-text report."""
+    # 1. Remove Markdown image syntax: ![alt](url)
+    summary = re.sub(r'!\[[^\]]*\]\([^\)]*\)', '', summary)
+    # 2. Remove ALL HTML tags (including <b>, <strong>, <img>, <a> etc.)
+    # This ensures the report is plain text and not bolded by source styles
+    summary = re.sub(r'<[^>]+>', '', summary)
+    # 3. Cleanup escaping/excess whitespace
+    return summary.strip()
+
+# filter_rows outcome codes (a str result means kept, with that cleaned summary)
+BLOCKED, OUT_OF_WINDOW, KEPT = -1, 0, 1
+
+def filter_rows(rows, start_time, end_time):
+    """
+    Filter worker over (title, summary, published) tuples. Returns one outcome
+    per row; runs unchanged in the parent or in a pool process.
+    """
+    results = []
+    for title, summary, published in rows:
+        article = {'title': title, 'summary': summary, 'published': published}
+        if is_blocked(article):
+            results.append(BLOCKED)
+        elif not is_in_window(article, start_time, end_time):
+            results.append(OUT_OF_WINDOW)
+        elif not SHOW_IMAGES and summary:
+            cleaned = clean_summary(summary)
+            # Only send the summary back when cleaning changed it
+            results.append(cleaned if cleaned != summary else KEPT)
+        else:
+            results.append(KEPT)
+    return results
+
+def filter_articles(articles, days=None, start_date=None, end_date=None, processes=None):
     """
     Filters articles within the specified time range and 
     removes articles containing blocked keywords.
+    Large inputs are sharded across the process pool (see parallel.py).
     """
-    if start_date and end_date:
-        start_time = start_date
-        end_time = end_date
-    else:
-        days_to_filter = days if days is not None else 1
-        end_time = datetime.now(timezone.utc)
-        start_time = end_time - timedelta(days=days_to_filter)
+    start_time, end_time = get_time_window(days, start_date, end_date)
+
+    rows = [(a.get('title', ''), a.get('summary', ''), a.get('published')) for a in articles]
+    outcomes = map_chunks(partial(filter_rows, start_time=start_time, end_time=end_time), rows, processes)
 
     filtered_articles = []
     blocked_count = 0
-
-    for article in articles:
-        # 1. Blocklist Filtering (Check title and summary)
-        title = article.get('title', '').lower()
-        summary = article.get('summary', '').lower()
-        
-        is_blocked = False
-        for kw in BLOCKED_KEYWORDS:
-            if kw.lower() in title or kw.lower() in summary:
-                is_blocked = True
-                break
-        
-        if is_blocked:
+    for article, outcome in zip(articles, outcomes):
+        if outcome == BLOCKED:
             blocked_count += 1
-            continue
-
-        # 2. Date Filtering
-        published_time = article.get('published')
-        if not published_time:
-            filtered_articles.append(article)
-            continue
-        if published_time.tzinfo is None:
-            published_time = published_time.replace(tzinfo=timezone.utc)
-        
-        if start_time <= published_time <= end_time:
+        elif outcome != OUT_OF_WINDOW:
+            # Optional: Cleanup summaries for a cleaner report (and save translation tokens)
+            if isinstance(outcome, str):
+                article['summary'] = outcome
             filtered_articles.append(article)
     
     if blocked_count > 0:
         print(f"    [BLOCK] Filtered out {blocked_count} articles based on blocklist.")
-    
-    # Optional: Cleanup summaries for a cleaner report (and save translation tokens)
-    if not SHOW_IMAGES:
-        for article in filtered_articles:
-            summary = article.get('summary', '')
-            if summary:
-                # 1. Remove Markdown image syntax: ![alt](url)
-                summary = re.sub(r'!\[[^\]]*\]\([^\)]*\)', '', summary)
-                # 2. Remove ALL HTML tags (including <b>, <strong>, <img>, <a> etc.)
-                # This ensures the report is plain text and not bolded by source styles
-                summary = re.sub(r'<[^>]+>', '', summary)
-                # 3. Cleanup escaping/excess whitespace
-                article['summary'] = summary.strip()
         
     return filtered_articles
 
+def iter_filter_articles(articles, days=None, start_date=None, end_date=None):
+    """Streaming variant of filter_articles: yields kept articles one at a time."""
+    start_time, end_time = get_time_window(days, start_date, end_date)
+    for article in articles:
+        if is_blocked(article) or not is_in_window(article, start_time, end_time):
+            continue
+        if not SHOW_IMAGES and article.get('summary'):
+            article['summary'] = clean_summary(article['summary'])
+        yield article
+
 def truncate_summary(text, word_limit=100):
     """Truncates text to a specified word limit while attempting to keep sentences whole."""
     if not text:
@@ -147,27 +296,208 @@ def truncate_summary(text, word_limit=100):
     # (Optional polish: can be added if needed, but simple join is usually fine)
     return truncated + "..."
 
+def clip_to_render_budget(text, word_limit=SUMMARY_WORD_LIMIT):
+    """
+    Cuts a cleaned summary to roughly what truncate_summary will render, so
+    characters that would be discarded after translation are never sent.
+    Ends on a sentence boundary when one keeps most of the budget.
+    """
+    if not text:
+        return ""
+
+    if len(CJK_CHAR.findall(text)) > len(text) * 0.2:
+        # CJK text has no spaces: budget by characters instead of words
+        limit = int(word_limit * CJK_CHARS_PER_WORD * RENDER_BUDGET_SLACK)
+        if len(text) <= limit:
+            return text
+        clipped = text[:limit]
+    else:
+        words = text.split()
+        limit = int(word_limit * RENDER_BUDGET_SLACK)
+        if len(words) <= limit:
+            return text
+        clipped = " ".join(words[:limit])
+
+    ends = [match.end() for match in SENTENCE_END.finditer(clipped)]
+    if ends and ends[-1] >= len(clipped) * 0.6:
+        return clipped[:ends[-1]]
+    return clipped
+
+def canonicalize_url(link):
+    """
+    Normalizes an article URL: no scheme, www, fragment, tracking params or trailing slash.
+    Returns '' for anything without a host ('N/A', relative paths), which is never matched.
+    """
+    if not link:
+        return ''
+    parsed = urlparse(link.strip())
+    if not parsed.netloc:
+        return ''
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = [(k, v) for k, v in parse_qsl(parsed.query) if not k.lower().startswith(TRACKING_PARAMS)]
+    path = parsed.path.rstrip('/')
+    return f"{host}{path}?{urlencode(sorted(query))}" if query else f"{host}{path}"
+
+def title_shingles(title):
+    """Word bigrams of a title (character bigrams for CJK text)."""
+    text = (title or '').lower()
+    if CJK_CHAR.search(text):
+        chars = [c for c in text if c.isalnum()]
+        return {a + b for a, b in zip(chars, chars[1:])}
+    words = re.findall(r'\w+', text)
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+def merge_sources(target, article, known_links=None):
+    """
+    Appends article's sources to target['sources'], skipping links already present.
+    Pass the target's link set as known_links to avoid rebuilding it on every merge.
+    """
+    if 'sources' not in target:
+        target['sources'] = [{'name': target['source_name'], 'link': target['link']}]
+    if known_links is None:
+        known_links = {s['link'] for s in target['sources']}
+    for source in article.get('sources') or [{'name': article['source_name'], 'link': article['link']}]:
+        if source['link'] not in known_links:
+            target['sources'].append(source)
+            known_links.add(source['link'])
+
+# Content a cluster takes over from the copy it keeps
+PROMOTED_FIELDS = ('title', 'link', 'summary', 'published', 'source_name', 'feed_order',
+                   'translated_title', 'translated_summary', 'topic_key')
+
+def ranks_before(article, representative):
+    """
+    Streaming only: True if article comes earlier in feed-list order than the
+    cluster's current representative, i.e. is the copy the batch path keeps.
+    """
+    order, current = article.get('feed_order'), representative.get('feed_order')
+    return order is not None and current is not None and order < current
+
+def promote(representative, article, promoted=None):
+    """
+    Makes representative (already merged with article) carry article's content,
+    so the kept copy does not depend on which feed finished first. Its
+    signature is dropped, and it is appended to promoted so the caller can
+    re-translate and re-categorize it.
+    """
+    for field in PROMOTED_FIELDS:
+        representative[field] = article.get(field)
+    representative['signature'] = None
+    # The kept copy's source comes first (save_news_articles stores sources[0])
+    representative['sources'].sort(key=lambda source: source['link'] != representative['link'])
+    if promoted is not None:
+        promoted.append(representative)
+
+class ArticleClusterer:
+    """
+    Incremental pre-translation clustering on original-language text.
+    Articles sharing a canonical URL, or whose title shingles overlap by at
+    least TITLE_SIMILARITY (Jaccard), join the first article of the cluster.
+    In streaming runs a cluster keeps its earliest copy in feed-list order, as
+    the batch path does; representatives that changed are collected in promoted.
+    """
+
+    def __init__(self, threshold=TITLE_SIMILARITY, promoted=None):
+        self.threshold = threshold
+        self.promoted = promoted
+        self.by_url = {}
+        self.shingle_index = defaultdict(list)
+        self.representatives = []
+        self.links = {}
+
+    def _find_similar(self, shingles):
+        if not shingles:
+            return None
+        overlaps = Counter()
+        for shingle in shingles:
+            overlaps.update(self.shingle_index.get(shingle, ()))
+        best, best_score = None, self.threshold
+        for index, shared in overlaps.items():
+            other = self.representatives[index][1]
+            score = shared / (len(shingles) + len(other) - shared)
+            if score >= best_score:
+                best, best_score = self.representatives[index][0], score
+        return best
+
+    def add(self, article):
+        """Returns the article if it starts a new cluster, or None if it was merged."""
+        url = canonicalize_url(article.get('link'))
+        shingles = title_shingles(article.get('title'))
+        representative = self.by_url.get(url) if url else None
+        if representative is None and len(shingles) >= 2:
+            representative = self._find_similar(shingles)
+
+        if representative is not None:
+            merge_sources(representative, article, self.links[id(representative)])
+            if ranks_before(article, representative):
+                promote(representative, article, self.promoted)
+            if url:
+                self.by_url.setdefault(url, representative)
+            return None
+
+        article['sources'] = [{'name': article['source_name'], 'link': article['link']}]
+        self.links[id(article)] = {article['link']}
+        if url:
+            self.by_url[url] = article
+        index = len(self.representatives)
+        self.representatives.append((article, shingles))
+        for shingle in shingles:
+            self.shingle_index[shingle].append(index)
+        return article
+
+def cluster_articles(articles):
+    """
+    Pre-translation clustering: keeps one representative per story so only it
+    is translated; the other copies are folded into its sources list.
+    """
+    print("\n[Stage 2.5/5] Clustering duplicate stories before translation...")
+    clusterer = ArticleClusterer()
+    representatives = [article for article in articles if clusterer.add(article) is not None]
+    print(f"    => {len(articles)} articles -> {len(representatives)} stories.")
+    return representatives
+
+def iter_deduplicate_and_merge(articles, threshold=NEAR_DUPLICATE_SIMILARITY,
+                               title_threshold=NEAR_DUPLICATE_TITLE_SIMILARITY, promoted=None):
+    """
+    Streaming merge: yields each new unique article as soon as it is seen.
+    Later near-duplicates (MinHash LSH over translated title + summary, or
+    over the translated title alone) are folded into the already-yielded
+    article's sources. A duplicate earlier in feed-list order takes over the
+    yielded article's content (see promote) and is appended to promoted.
+    """
+    index = NearDuplicateIndex(threshold)
+    title_index = NearDuplicateIndex(title_threshold)
+    links_by_article = {}
+    for article in articles:
+        # Articles whose translation failed carry no topic_key and are never merged
+        signature = title_signature = None
+        if article.get('topic_key'):
+            signature = minhash_signature(text_shingles(article_signature_text(article)))
+            title_signature = minhash_signature(text_shingles(article_title_text(article)))
+
+        unique_article = index.query(signature)
+        if unique_article is None:
+            unique_article = title_index.query(title_signature)
+        if unique_article is not None:
+            merge_sources(unique_article, article, links_by_article[id(unique_article)])
+            if ranks_before(article, unique_article):
+                promote(unique_article, article, promoted)
+            continue
+
+        if 'sources' not in article:
+            article['sources'] = [{'name': article['source_name'], 'link': article['link']}]
+        if signature is not None:
+            article['signature'] = signature
+            links_by_article[id(article)] = {s['link'] for s in article['sources']}
+            index.add(signature, article)
+            title_index.add(title_signature, article)
+        yield article
+
 def deduplicate_and_merge_articles(articles):
-    """Identifies and merges similar articles based on topics."""
+    """Identifies and merges near-duplicate stories."""
     print("\n[Stage 4/5] Merging similar articles...")
-    unique_articles = []
-    for article in tqdm(articles, desc="Merging"):
-        source_info = {'name': article['source_name'], 'link': article['link']}
-        current_topic = article.get('topic_key')
-        
-        is_duplicate = False
-        if current_topic:
-            for unique_article in unique_articles:
-                if current_topic == unique_article.get('topic_key'):
-                    if 'sources' not in unique_article:
-                        unique_article['sources'] = [{'name': unique_article['source_name'], 'link': unique_article['link']}]
-                    if not any(s['link'] == source_info['link'] for s in unique_article['sources']):
-                        unique_article['sources'].append(source_info)
-                    is_duplicate = True
-                    break
-        
-        if not is_duplicate:
-            new_article = article.copy()
-            new_article['sources'] = [source_info]
-            unique_articles.append(new_article)
-    return unique_articles
\ No newline at end of file
+    return list(iter_deduplicate_and_merge(tqdm(articles, desc="Merging")))
@@ -0,0 +1,61 @@
+import re
+import threading
+import time
+
+# Markers of throttling / transient server failures in translator exceptions; status
+# codes only as whole numbers, so e.g. "more than 5000 characters" is not a 500
+THROTTLE_MARKERS = re.compile(r'\b(?:429|5\d\d)\b|too many requests|rate limit|quota')
+
+def is_throttle_error(exc):
+    """Heuristically detects 429/5xx-style failures across translator backends."""
+    status = getattr(getattr(exc, 'response', None), 'status_code', None) or getattr(exc, 'status_code', None)
+    if status is not None:
+        return status == 429 or status >= 500
+    if type(exc).__name__ == 'TooManyRequests':
+        return True
+    message = str(exc).lower()
+    return THROTTLE_MARKERS.search(message) is not None
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by all workers of a stage.
+    The refill rate adapts AIMD-style: it creeps up by `increase` req/s on each
+    success (up to max_rate) and halves on each throttling signal (down to min_rate).
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=0.2, max_rate=None, increase=0.05):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self.min_rate = min_rate
+        self.max_rate = float(max_rate or rate)
+        self.increase = increase
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.throttled = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def record_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def record_throttle(self):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+            self.throttled += 1
@@ -1,6 +1,7 @@
 import datetime
 import os
-from app.core.processor import truncate_summary
+from app.core.processor import truncate_summary, SUMMARY_WORD_LIMIT
+from app.core.story_threads import format_thread_note
 
 def write_markdown_file(categorized_articles, output_filename=""):
     """
@@ -45,10 +46,11 @@ def write_markdown_file(categorized_articles, output_filename=""):
                     
                     # Article Title with Source Links
                     f.write(f"### {article['translated_title']} (Source: {source_line})\n\n")
+                    f.write(format_thread_note(article))
                     
                     # Translated Summary
                     if article['translated_summary']:
-                        truncated_summary = truncate_summary(article['translated_summary'], word_limit=100)
+                        truncated_summary = truncate_summary(article['translated_summary'], word_limit=SUMMARY_WORD_LIMIT)
                         f.write(f"{truncated_summary}\n\n")
                     
                     f.write("---\n\n")
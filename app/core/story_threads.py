@@ -0,0 +1,223 @@
+import sqlite3
+import time
+from array import array
+from collections import Counter, defaultdict
+from datetime import datetime
+from app.core.news_db import get_news_db_connection, init_news_db
+from app.core.near_duplicates import (
+    NearDuplicateIndex, article_signature_text, estimate_similarity,
+    minhash_signature, text_shingles,
+)
+import config.settings as settings
+
+config = getattr(settings, 'NEWS_CONFIG', {}).get('story_threads', {})
+
+ENABLED = config.get('enabled', True)
+SIMILARITY = config.get('similarity', 0.35)
+REPEAT_SIMILARITY = config.get('repeat_similarity', 0.8)
+SUPPRESS_REPEATS = config.get('suppress_repeats', False)
+MAX_AGE_DAYS = config.get('max_age_days', 14)
+
+CENTROID_MEMBERS = 20   # Most recent member signatures a thread centroid is built from
+
+def pack_signature(signature):
+    return array('Q', signature).tobytes()
+
+def unpack_signature(blob):
+    values = array('Q')
+    values.frombytes(blob)
+    return tuple(values)
+
+def centroid_of(signatures):
+    """Per-position most common value; ties go to the earliest signature passed (pass newest first)."""
+    return tuple(Counter(column).most_common(1)[0][0] for column in zip(*signatures))
+
+def format_thread_note(article):
+    """Markdown line marking an article as an update to an ongoing story, or ''."""
+    thread = article.get('thread')
+    if not thread:
+        return ''
+    since = datetime.fromtimestamp(thread['first_seen']).strftime('%Y-%m-%d')
+    return f"> 🧵 Update to ongoing story: **{thread['title']}** (following since {since}, {thread['article_count']} earlier articles)\n\n"
+
+class StoryThreadIndex:
+    """
+    Cross-day story index persisted in news_data.db. Each thread keeps a
+    MinHash centroid of its recent members; threads active within
+    MAX_AGE_DAYS are loaded into an LSH index once per run, so assigning an
+    article is a bucket lookup and nothing is re-clustered from scratch.
+    """
+
+    def __init__(self, now=None):
+        self.now = now or time.time()
+        self.threads = {}
+        self.index = NearDuplicateIndex(SIMILARITY)
+        self.member_thread = {}
+        # Links stored by earlier runs, per thread
+        self.earlier_links = defaultdict(set)
+        self.dirty = set()
+        self.created = 0
+
+        init_news_db()
+        self.conn = get_news_db_connection()
+        self.evict()
+        for row in self.conn.execute('''
+            SELECT thread_id, title, centroid, last_signature, last_link, article_count, first_seen, last_seen
+            FROM story_threads
+        '''):
+            thread = {
+                'thread_id': row[0], 'title': row[1], 'centroid': unpack_signature(row[2]),
+                'last_signature': unpack_signature(row[3]), 'last_link': row[4],
+                'article_count': row[5], 'first_seen': row[6], 'last_seen': row[7],
+            }
+            thread['previous_signature'] = thread['last_signature']
+            thread['previous_link'] = thread['last_link']
+            self.threads[thread['thread_id']] = thread
+            self.index.add(thread['centroid'], thread)
+        for link, thread_id in self.conn.execute("SELECT link, thread_id FROM story_thread_members"):
+            self.member_thread[link] = thread_id
+            self.earlier_links[thread_id].add(link)
+
+    def evict(self):
+        """Drops threads (and their members) without new articles for MAX_AGE_DAYS."""
+        cutoff = self.now - MAX_AGE_DAYS * 86400
+        self.conn.execute("DELETE FROM story_thread_members WHERE thread_id IN (SELECT thread_id FROM story_threads WHERE last_seen < ?)", (cutoff,))
+        self.conn.execute("DELETE FROM story_threads WHERE last_seen < ?", (cutoff,))
+
+    def _create_thread(self, article, signature):
+        cursor = self.conn.execute('''
+            INSERT INTO story_threads (title, centroid, last_signature, last_link, article_count, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, 0, ?, ?)
+        ''', (
+            article.get('translated_title') or article.get('title'),
+            pack_signature(signature), pack_signature(signature), article.get('link'), self.now, self.now
+        ))
+        thread = {
+            'thread_id': cursor.lastrowid, 'title': article.get('translated_title') or article.get('title'),
+            'centroid': signature, 'last_signature': signature, 'last_link': article.get('link'),
+            'article_count': 0, 'first_seen': self.now, 'last_seen': self.now,
+            'previous_signature': None, 'previous_link': None,
+        }
+        self.threads[thread['thread_id']] = thread
+        self.created += 1
+        return thread
+
+    def _add_member(self, thread, links, article, signature):
+        """Stores the article's links under the thread and refreshes its centroid."""
+        new_links = [link for link in links if link not in self.member_thread]
+        if not new_links:
+            return
+        thread_id = thread['thread_id']
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO story_thread_members (link, thread_id, signature, seen_at) VALUES (?, ?, ?, ?)",
+            [(link, thread_id, pack_signature(signature), self.now) for link in new_links]
+        )
+        for link in new_links:
+            self.member_thread[link] = thread_id
+
+        # Includes the rows just inserted (same connection, not yet committed)
+        recent = [unpack_signature(blob) for (blob,) in self.conn.execute(
+            "SELECT signature FROM story_thread_members WHERE thread_id = ? ORDER BY seen_at DESC, rowid DESC LIMIT ?",
+            (thread_id, CENTROID_MEMBERS)
+        )]
+        thread['centroid'] = centroid_of(recent)
+        thread['last_signature'] = signature
+        thread['last_link'] = article.get('link')
+        thread['article_count'] += 1
+        thread['last_seen'] = self.now
+        # The old centroid's buckets still point at this thread; the best match wins either way
+        self.index.add(thread['centroid'], thread)
+        self.dirty.add(thread_id)
+
+    def assign(self, article):
+        """
+        Links the article to its thread, creating one if needed. Sets
+        article['thread'] when it updates a story reported by an earlier run.
+        Returns True if it is a near-identical repeat of that earlier report.
+        """
+        signature = article.get('signature') or minhash_signature(text_shingles(article_signature_text(article)))
+        if signature is None:
+            return False
+        links = {source['link'] for source in article.get('sources') or []}
+        if article.get('link'):
+            links.add(article['link'])
+
+        # An article seen by an earlier run stays in its thread
+        thread = None
+        for link in links:
+            if link in self.member_thread:
+                thread = self.threads.get(self.member_thread[link])
+                break
+        if thread is None:
+            thread = self.index.query(signature)
+        if thread is None:
+            thread = self._create_thread(article, signature)
+
+        earlier = self.earlier_links[thread['thread_id']] - links
+        is_repeat = False
+        if earlier:
+            article['thread'] = {
+                'id': thread['thread_id'], 'title': thread['title'],
+                'first_seen': thread['first_seen'], 'article_count': len(earlier),
+            }
+            is_repeat = (
+                thread['previous_link'] not in links
+                and estimate_similarity(signature, thread['previous_signature']) >= REPEAT_SIMILARITY
+            )
+        self._add_member(thread, links, article, signature)
+        return is_repeat
+
+    def save(self):
+        self.conn.executemany('''
+            UPDATE story_threads
+            SET centroid = ?, last_signature = ?, last_link = ?, article_count = ?, last_seen = ?
+            WHERE thread_id = ?
+        ''', [
+            (pack_signature(t['centroid']), pack_signature(t['last_signature']), t['last_link'],
+             t['article_count'], t['last_seen'], t['thread_id'])
+            for t in (self.threads[thread_id] for thread_id in self.dirty)
+        ])
+        self.conn.commit()
+        self.dirty.clear()
+
+    def close(self):
+        self.conn.close()
+
+def apply_story_threads(articles, persist=True):
+    """
+    Links the digest's articles to cross-day story threads. Articles that
+    continue an earlier story are labelled; near-identical repeats of an
+    earlier report are dropped when suppress_repeats is set.
+    persist=False (replay) labels the articles but leaves the index unchanged.
+    Returns the articles to report.
+    """
+    if not ENABLED or not articles:
+        return articles
+    print("\n[*] Linking stories to ongoing threads...")
+    try:
+        index = StoryThreadIndex()
+    except sqlite3.Error as e:
+        print(f"[WARN] Story thread index unavailable: {e}")
+        return articles
+
+    reported = []
+    repeats = 0
+    try:
+        for article in articles:
+            if index.assign(article):
+                repeats += 1
+                if SUPPRESS_REPEATS:
+                    continue
+            reported.append(article)
+        if persist:
+            index.save()
+    except sqlite3.Error as e:
+        print(f"[WARN] Failed to update story threads: {e}")
+        return articles
+    finally:
+        index.close()
+
+    updates = sum(1 for article in reported if article.get('thread'))
+    action = "suppressed" if SUPPRESS_REPEATS else "kept"
+    print(f"    => {updates} updates to ongoing stories, {index.created} new threads, {repeats} near-identical repeats {action}.")
+    return reported
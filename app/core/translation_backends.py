@@ -0,0 +1,108 @@
+import requests
+import config.settings as settings
+
+config = getattr(settings, 'NEWS_CONFIG', {}).get('translation', {})
+
+# Backend selection: 'google' (default), 'http' (LibreTranslate-style API) or 'stub'
+BACKEND = config.get('backend', 'google')
+BACKEND_URL = config.get('backend_url', 'http://127.0.0.1:5000')
+BACKEND_API_KEY = config.get('api_key')
+BACKEND_TIMEOUT = config.get('backend_timeout', 30)
+STUB_URL = config.get('stub_url', 'http://127.0.0.1:5055')
+
+# Batched texts are newline-joined by backends without a native batch API
+BATCH_SEPARATOR = '\n'
+
+class TranslationBackend:
+    """
+    Interface every translation backend implements.
+    translate() handles one string; translate_many() handles a batch in as
+    few requests as the backend allows and returns None when the results
+    cannot be mapped back one-to-one.
+    """
+    name = 'base'
+    max_chars = 4500
+
+    def __init__(self, source='auto', target='en'):
+        self.source = source
+        self.target = target
+
+    def translate(self, text):
+        raise NotImplementedError
+
+    def translate_many(self, texts):
+        result = self.translate(BATCH_SEPARATOR.join(texts))
+        parts = result.split(BATCH_SEPARATOR) if result else []
+        if len(parts) == len(texts) and all(part.strip() for part in parts):
+            return [part.strip() for part in parts]
+        return None
+
+class GoogleBackend(TranslationBackend):
+    """Google Translate via deep_translator (web endpoint, 5000-char payload limit)."""
+    name = 'google'
+    max_chars = 4500
+
+    def __init__(self, source='auto', target='en'):
+        super().__init__(source, target)
+        from deep_translator import GoogleTranslator
+        self.client = GoogleTranslator(source=source, target=target)
+
+    def translate(self, text):
+        return self.client.translate(text)
+
+class HttpBackend(TranslationBackend):
+    """
+    Generic HTTP backend speaking the LibreTranslate API:
+    POST {url}/translate with {"q", "source", "target", "format", "api_key"}.
+    A list-valued "q" is used for native batching.
+    """
+    name = 'http'
+    max_chars = 10000
+
+    def __init__(self, source='auto', target='en', url=BACKEND_URL, api_key=BACKEND_API_KEY, timeout=BACKEND_TIMEOUT):
+        super().__init__(source, target)
+        self.url = url.rstrip('/') + '/translate'
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _post(self, q):
+        payload = {'q': q, 'source': self.source, 'target': self.target, 'format': 'text'}
+        if self.api_key:
+            payload['api_key'] = self.api_key
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        # HTTPError carries the response, so 429/5xx are recognized as throttling
+        response.raise_for_status()
+        return response.json()['translatedText']
+
+    def translate(self, text):
+        return self._post(text)
+
+    def translate_many(self, texts):
+        translations = self._post(list(texts))
+        if isinstance(translations, list) and len(translations) == len(texts):
+            return translations
+        return None
+
+class StubBackend(HttpBackend):
+    """Local stand-in server speaking the same API, see app/core/translation_stub.py."""
+    name = 'stub'
+
+    def __init__(self, source='auto', target='en', url=STUB_URL, api_key=None, timeout=BACKEND_TIMEOUT):
+        super().__init__(source, target, url=url, api_key=api_key, timeout=timeout)
+
+def cache_source(source='auto', name=None):
+    """Source-language key for the translation cache; the stub's fake output is kept apart from real translations."""
+    name = name or BACKEND
+    return f"{source}@{name}" if name == 'stub' else source
+
+def create_backend(source='auto', target='en', name=None):
+    """Builds the backend selected by NEWS_CONFIG['translation']['backend']."""
+    name = name or BACKEND
+    if name == 'google':
+        return GoogleBackend(source, target)
+    if name == 'http':
+        return HttpBackend(source, target, url=BACKEND_URL)
+    if name == 'stub':
+        return StubBackend(source, target)
+    raise ValueError(f"Unknown translation backend: {name}")
@@ -0,0 +1,139 @@
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+from app.core.news_db import get_news_db_connection, init_news_db
+from app.core.processor import clip_to_render_budget
+import config.settings as settings
+
+config = getattr(settings, 'NEWS_CONFIG', {}).get('translation_cache', {})
+
+MAX_ENTRIES = config.get('max_entries', 200000)     # Rows kept in SQLite after eviction
+MAX_AGE_DAYS = config.get('max_age_days', 90)        # Entries unused for longer are evicted
+HOT_ENTRIES = config.get('hot_entries', 5000)        # In-process LRU size
+
+# Must match the summary slices translator.py may send so seeded keys line up
+SEED_SUMMARY_CHARS = 2000
+
+def hash_text(text):
+    """Content address of a source string."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class TranslationCache:
+    """
+    Content-addressed translation cache keyed by (text hash, source lang, target lang).
+    Stored in the translation_cache table of news_data.db, with an in-process
+    LRU of hot entries in front of it. Call flush() to persist new entries.
+    read_only=True (replay) only looks entries up: nothing is seeded, stored or evicted.
+    """
+
+    def __init__(self, target, source='auto', read_only=False):
+        self.target = target
+        self.source = source
+        self.read_only = read_only
+        self.hot = OrderedDict()
+        self.pending = {}
+        self.touched = set()
+        self.hits = 0
+        self.misses = 0
+
+        init_news_db()
+        self.conn = get_news_db_connection()
+        if not read_only and self.conn.execute("SELECT 1 FROM translation_cache LIMIT 1").fetchone() is None:
+            self.seed_from_articles()
+
+    def _remember(self, text_hash, translated):
+        self.hot[text_hash] = translated
+        self.hot.move_to_end(text_hash)
+        if len(self.hot) > HOT_ENTRIES:
+            self.hot.popitem(last=False)
+
+    def get(self, text):
+        """Returns the cached translation of text, or None."""
+        text_hash = hash_text(text)
+        if text_hash in self.hot:
+            self.hot.move_to_end(text_hash)
+            self.touched.add(text_hash)
+            self.hits += 1
+            return self.hot[text_hash]
+
+        row = self.conn.execute(
+            "SELECT translated FROM translation_cache WHERE text_hash = ? AND source_lang = ? AND target_lang = ?",
+            (text_hash, self.source, self.target)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.touched.add(text_hash)
+        self._remember(text_hash, row[0])
+        return row[0]
+
+    def put(self, text, translated):
+        text_hash = hash_text(text)
+        self.pending[text_hash] = translated
+        self._remember(text_hash, translated)
+
+    def seed_from_articles(self):
+        """Seeds an empty cache from translations already stored in news_articles."""
+        rows = []
+        now = time.time()
+        for title, translated_title, summary, translated_summary in self.conn.execute(
+            "SELECT title, translated_title, summary, translated_summary FROM news_articles"
+        ):
+            if title and translated_title and translated_title != title:
+                rows.append((hash_text(title), self.source, self.target, translated_title, now))
+            if not summary or not translated_summary:
+                continue
+            for source_text in {summary[:SEED_SUMMARY_CHARS], clip_to_render_budget(summary)}:
+                if translated_summary != source_text:
+                    rows.append((hash_text(source_text), self.source, self.target, translated_summary, now))
+        if rows:
+            self.conn.executemany('''
+                INSERT OR IGNORE INTO translation_cache (text_hash, source_lang, target_lang, translated, last_used)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            self.conn.commit()
+            print(f"[*] Seeded translation cache with {len(rows)} entries from news_articles.")
+
+    def flush(self):
+        """Persists new entries, refreshes last-used times and evicts stale rows."""
+        if self.read_only:
+            self.pending.clear()
+            self.touched.clear()
+            return
+        now = time.time()
+        try:
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO translation_cache (text_hash, source_lang, target_lang, translated, last_used)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(h, self.source, self.target, t, now) for h, t in self.pending.items()])
+            self.conn.executemany(
+                "UPDATE translation_cache SET last_used = ? WHERE text_hash = ? AND source_lang = ? AND target_lang = ?",
+                [(now, h, self.source, self.target) for h in self.touched - self.pending.keys()]
+            )
+            self.evict(now)
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"[WARN] Failed to save translation cache: {e}")
+        self.pending.clear()
+        self.touched.clear()
+
+    def evict(self, now=None):
+        """Drops entries unused for MAX_AGE_DAYS, then the least recently used beyond MAX_ENTRIES."""
+        now = now or time.time()
+        self.conn.execute("DELETE FROM translation_cache WHERE last_used < ?", (now - MAX_AGE_DAYS * 86400,))
+        count = self.conn.execute("SELECT COUNT(*) FROM translation_cache").fetchone()[0]
+        if count > MAX_ENTRIES:
+            self.conn.execute('''
+                DELETE FROM translation_cache WHERE rowid IN (
+                    SELECT rowid FROM translation_cache ORDER BY last_used ASC LIMIT ?
+                )
+            ''', (count - MAX_ENTRIES,))
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+        if self.hits or self.misses:
+            print(f"[*] Translation cache: {self.hits} hits, {self.misses} misses.")
@@ -0,0 +1,113 @@
+"""
+Deterministic local stand-in for a LibreTranslate-style translation server.
+Used to benchmark and load-test the news pipeline offline.
+
+    python -m app.core.translation_stub --port 5055 --latency 0.2 --error-rate 0.05
+
+Then set NEWS_CONFIG['translation']['backend'] = 'stub' in config/settings.py.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def fake_translate(text, target):
+    """Deterministic 'translation': the text tagged with its target language."""
+    return f"[{target}] {text}"
+
+class StubState:
+    """Shared, seeded state so latency and failures are reproducible across runs."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, max_chars=10000, seed=42):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_chars = max_chars
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def next_draw(self):
+        with self.lock:
+            self.requests += 1
+            return self.random.random(), self.random.random()
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path.rstrip('/') != '/translate':
+                return self._reply(404, {'error': 'Not found'})
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return self._reply(400, {'error': 'Invalid JSON'})
+
+            error_draw, jitter_draw = state.next_draw()
+            time.sleep(state.latency + state.jitter * jitter_draw)
+            if error_draw < state.error_rate:
+                with state.lock:
+                    state.errors += 1
+                # Alternate between the two throttling signals real backends send
+                status = 429 if error_draw < state.error_rate / 2 else 503
+                return self._reply(status, {'error': 'Simulated failure'})
+
+            q = payload.get('q', '')
+            texts = q if isinstance(q, list) else [q]
+            if sum(len(t) for t in texts) > state.max_chars:
+                return self._reply(413, {'error': f'Payload exceeds {state.max_chars} characters'})
+
+            target = payload.get('target', 'en')
+            translated = [fake_translate(t, target) for t in texts]
+            self._reply(200, {'translatedText': translated if isinstance(q, list) else translated[0]})
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+def start_stub_server(port=5055, host='127.0.0.1', **options):
+    """Starts the stand-in server on a background thread and returns (server, state)."""
+    state = StubState(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in translation server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--latency', type=float, default=0.0, help="Fixed seconds added to every request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random seconds (0..jitter) per request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 429/503")
+    parser.add_argument('--max-chars', type=int, default=10000, help="Reject payloads above this size with 413")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    server, state = start_stub_server(
+        port=args.port, host=args.host, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, max_chars=args.max_chars, seed=args.seed
+    )
+    print(f"Translation stub listening on http://{args.host}:{args.port}/translate (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\nServed {state.requests} requests ({state.errors} simulated errors).")
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,255 @@
-from deep_translator import GoogleTranslator
 from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 import re
+from app.core.translation_cache import TranslationCache
+from app.core.rate_limiter import TokenBucket, is_throttle_error
+from app.core.translation_backends import cache_source, create_backend
+from app.core.lang_detect import LanguageProfiles, detect_language, normalize_language
+from app.core.processor import clip_to_render_budget
+import config.settings as settings
 from config.settings import TARGET_LANGUAGE
 
-def translate_articles(articles):
+config = getattr(settings, 'NEWS_CONFIG', {}).get('translation', {})
+
+# Per-request payload cap; defaults to the backend's own limit
+MAX_BATCH_CHARS = config.get('batch_chars')
+SUMMARY_CHARS = 2000
+# Translate only the part of each summary the report will render
+RENDER_BUDGET = config.get('render_budget', True)
+TARGET_BASE_LANGUAGE = normalize_language(TARGET_LANGUAGE)
+
+# Concurrency and rate limiting
+WORKERS = config.get('workers', 4)
+RATE_LIMIT = config.get('rate_limit', 3.0)          # Initial requests per second
+MAX_RATE_LIMIT = config.get('max_rate_limit', 10.0) # Ceiling for adaptive speed-up
+MAX_RETRIES = config.get('max_retries', 3)
+BACKOFF_BASE = 1.0                                  # Seconds, doubled per retry
+
+def make_topic_key(translated_title):
+    """Simple keyword-based topic key for merging."""
+    clean_title = re.sub(r'[^\w\s]', '', translated_title)
+    return clean_title[:10].strip().lower()
+
+def needs_translation(article, profiles=None):
     """
-    Translates article titles and summaries into target language (default: English).
+    Decides whether an article is not already in the target language.
+    Uses fast script/stopword detection on the title and summary head; when
+    that is inconclusive, falls back to the source's learned language profile,
+    and finally to the non-ASCII heuristic.
     """
-    print(f"\n[Stage 3/5] Starting translation to {TARGET_LANGUAGE}...")
-    processed_articles = []
-    
-    # Initialize translator
-    translator = GoogleTranslator(source='auto', target=TARGET_LANGUAGE)
-
-    for article in tqdm(articles, desc="Translating"):
-        new_article = article.copy()
-        
+    title = article.get('title', '')
+    if not title:
+        return False
+
+    source_name = article.get('source_name')
+    lang = detect_language(f"{title} {article.get('summary', '')[:300]}")
+    if lang and profiles is not None:
+        profiles.observe(source_name, lang)
+    elif profiles is not None:
+        lang = profiles.dominant(source_name)
+
+    if lang:
+        return lang != TARGET_BASE_LANGUAGE
+    # Undetermined: translate if the title contains non-ASCII (Chinese, accented characters)
+    return any(ord(c) > 127 for c in title)
+
+def summary_source_text(summary):
+    """The slice of a summary that is sent for translation."""
+    if RENDER_BUDGET:
+        return clip_to_render_budget(summary)
+    return summary[:SUMMARY_CHARS]
+
+def pack_batches(texts, max_chars):
+    """Greedily packs texts into batches whose joined payload stays within max_chars."""
+    batches, current, size = [], [], 0
+    for text in texts:
+        cost = len(text) + 1
+        if current and size + cost > max_chars:
+            batches.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def create_rate_limiter():
+    """Token bucket shared by every translation worker of a run."""
+    return TokenBucket(RATE_LIMIT, capacity=WORKERS, max_rate=MAX_RATE_LIMIT)
+
+def call_translator(request, payload, limiter, sent=None):
+    """
+    Sends one rate-limited backend request (translate or translate_many),
+    backing off exponentially and slowing the shared limiter on 429/5xx-style failures.
+    Every request sent, retries included, is counted in sent['requests'].
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire()
+        if sent is not None:
+            sent['requests'] += 1
         try:
-            # Check Title: Translate if it has non-ASCII (Chinese/French accents) OR 
-            # if we are targeting English and it looks like it might be French.
-            # For simplicity, if Target is English and text is purely ASCII, we can often skip.
-            title = article.get('title', '')
-            should_translate = False
-            
-            if title:
-                # If contains non-ASCII (Chinese, Accented characters like in French)
-                if any(ord(c) > 127 for c in title):
-                    should_translate = True
-                # If target is English but source source_name is lefigaro (French), we should translate
-                elif TARGET_LANGUAGE == 'en' and article.get('source_name') == 'lefigaro':
-                    should_translate = True
-                
-            if should_translate:
-                new_article['translated_title'] = translator.translate(title)
-            else:
-                new_article['translated_title'] = title
-            
-            # Summary
-            summary = article.get('summary', '')[:2000]
-            if summary:
-                # Same check for summary but we skip if already translated title was skipped
-                if should_translate:
-                    new_article['translated_summary'] = translator.translate(summary)
-                else:
-                    new_article['translated_summary'] = summary
-            else:
-                new_article['translated_summary'] = ""
-            
-            # Simple keyword-based topic key for merging
-            clean_title = re.sub(r'[^\w\s]', '', new_article['translated_title'])
-            new_article['topic_key'] = clean_title[:10].strip().lower()
-            
-            processed_articles.append(new_article)
-            time.sleep(0.3) # Slightly reduced delay
+            result = request(payload)
+            limiter.record_success()
+            return result
+        except Exception as e:
+            if attempt >= MAX_RETRIES or not is_throttle_error(e):
+                raise
+            limiter.record_throttle()
+            time.sleep(BACKOFF_BASE * 2 ** attempt)
 
+def translate_batch(batch, translator, limiter):
+    """
+    Translates a batch of single-line texts in one backend request.
+    Falls back to one request per text if the results do not map back
+    one-to-one. Returns (translations, request_count); failed items come back as None.
+    """
+    sent = {'requests': 0}
+    if len(batch) > 1:
+        try:
+            translations = call_translator(translator.translate_many, batch, limiter, sent)
+            if translations is not None:
+                return translations, sent['requests']
+        except Exception as e:
+            print(f"\n[WARN] Batch translation failed, retrying item by item: {e}")
+
+    translations = []
+    for text in batch:
+        try:
+            translations.append(call_translator(translator.translate, text, limiter, sent))
         except Exception as e:
             print(f"\n[ERR] Translation error: {e}")
-            new_article['translated_title'] = article.get('title', 'N/A')
-            new_article['translated_summary'] = article.get('summary', '')
-            new_article['topic_key'] = None
-            processed_articles.append(new_article)
-            time.sleep(1)
+            translations.append(None)
+    return translations, sent['requests']
+
+def translate_texts(texts, translator, cache=None, limiter=None, desc="Translating"):
+    """
+    Translates many strings with as few requests as possible, spreading
+    batches over WORKERS threads that share one token-bucket limiter.
+    With translator=None only cached translations are returned (no requests).
+    Returns {text: translation}; texts that failed are missing from the result.
+    """
+    results = {}
+    pending = []
+    for text in dict.fromkeys(texts):
+        cached = cache.get(text) if cache is not None else None
+        if cached is not None:
+            results[text] = cached
+        else:
+            pending.append(text)
+    if not pending:
+        return results
+    if translator is None:
+        print(f"    => {len(pending)} texts not in the translation cache, left untranslated.")
+        return results
+
+    # Map each flattened line back to every original text that produced it
+    flattened = {}
+    for text in pending:
+        flattened.setdefault(' '.join(text.split()), []).append(text)
+
+    limiter = limiter or create_rate_limiter()
+    batches = pack_batches(list(flattened), MAX_BATCH_CHARS or translator.max_chars)
+    requests_made = 0
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, min(WORKERS, len(batches)))) as executor:
+        futures = {executor.submit(translate_batch, batch, translator, limiter): batch for batch in batches}
+        for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+            translations, request_count = future.result()
+            requests_made += request_count
+            # Results are merged (and cached) on the calling thread only
+            for line, translated in zip(futures[future], translations):
+                if not translated:
+                    continue
+                for text in flattened[line]:
+                    results[text] = translated
+                    if cache is not None:
+                        cache.put(text, translated)
+
+    elapsed = max(time.time() - start_time, 1e-6)
+    chars = sum(len(line) for line in flattened)
+    print(f"    => {len(pending)} texts translated in {requests_made} requests, {elapsed:.1f}s "
+          f"({requests_made / elapsed:.1f} req/s, {chars / elapsed:.0f} chars/s, "
+          f"limit now {limiter.rate:.1f} req/s, {limiter.throttled} throttled).")
+    return results
+
+def translate_batch_articles(articles, translator, cache=None, limiter=None, profiles=None):
+    """
+    Translates a list of articles, packing titles and (separately) summaries
+    into batched requests. Fills in translated_title, translated_summary and
+    topic_key in place and returns the same articles.
+    """
+    to_translate = [
+        article for article in articles
+        if not article.get('translated_title') and needs_translation(article, profiles)
+    ]
+    skipped = sum(1 for article in articles if not article.get('translated_title')) - len(to_translate)
+    if skipped:
+        print(f"    => {skipped} articles already in {TARGET_LANGUAGE}, skipping translation.")
+    limiter = limiter or create_rate_limiter()
+    titles = translate_texts([a['title'] for a in to_translate], translator, cache, limiter, desc="Translating titles")
+    summaries = translate_texts(
+        [summary_source_text(a['summary']) for a in to_translate if a.get('summary')],
+        translator, cache, limiter, desc="Translating summaries"
+    )
+    pending = {id(article) for article in to_translate}
+
+    for article in articles:
+        if article.get('translated_title'):
+            # Already translated (e.g. rehydrated from the news DB)
+            article.setdefault('translated_summary', '')
+            article['topic_key'] = make_topic_key(article['translated_title'])
+        elif id(article) not in pending:
+            article['translated_title'] = article.get('title', '')
+            article['translated_summary'] = article.get('summary', '')[:SUMMARY_CHARS]
+            article['topic_key'] = make_topic_key(article['translated_title'])
+        else:
+            title = article['title']
+            summary = summary_source_text(article.get('summary', ''))
+            article['translated_title'] = titles.get(title, title)
+            article['translated_summary'] = summaries.get(summary, article.get('summary', '')) if summary else ""
+            # A failed title translation disables merging for this article
+            article['topic_key'] = make_topic_key(titles[title]) if title in titles else None
+    return articles
 
-    return processed_articles
+def translate_articles(articles, offline=False):
+    """
+    Translates article titles and summaries into target language (default: English).
+    Articles that already carry a translated_title (e.g. rehydrated from the
+    news DB) are passed through without a remote call. offline=True (replay)
+    uses only the translation cache, without writing to it, and saves no
+    learned language profiles.
+    """
+    if offline:
+        translator = None
+        print(f"\n[Stage 3/5] Translating to {TARGET_LANGUAGE} from the translation cache only (offline)...")
+    else:
+        # Initialize translator backend selected in settings
+        translator = create_backend(source='auto', target=TARGET_LANGUAGE)
+        print(f"\n[Stage 3/5] Starting translation to {TARGET_LANGUAGE} via {translator.name} backend...")
+    cache = TranslationCache(target=TARGET_LANGUAGE, source=cache_source(), read_only=offline)
+    profiles = LanguageProfiles()
+
+    try:
+        return translate_batch_articles(articles, translator, cache, profiles=profiles)
+    finally:
+        cache.close()
+        if not offline:
+            profiles.save()
+
+def iter_translate_articles(batches, offline=False):
+    """
+    Streaming variant of translate_articles: takes an iterable of article
+    batches (e.g. one per feed) and yields translated articles as each batch completes.
+    """
+    translator = None if offline else create_backend(source='auto', target=TARGET_LANGUAGE)
+    cache = TranslationCache(target=TARGET_LANGUAGE, source=cache_source(), read_only=offline)
+    limiter = create_rate_limiter()
+    profiles = LanguageProfiles()
+    try:
+        for batch in batches:
+            yield from translate_batch_articles(batch, translator, cache, limiter, profiles)
+    finally:
+        cache.close()
+        if not offline:
+            profiles.save()
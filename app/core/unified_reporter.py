@@ -2,20 +2,24 @@
 import os
 import datetime
 from app.core.arb_reporter import fetch_daily_data, format_liq, format_table
-from app.core.processor import truncate_summary
+from app.core.processor import truncate_summary, SUMMARY_WORD_LIMIT
+from app.core.story_threads import format_thread_note
 from config.settings import STRATEGY_CONFIG
 
-def generate_unified_report(categorized_news=None, include_arb=True):
+def generate_unified_report(categorized_news=None, include_arb=True, variant=None):
     """
     Combines News Summary and Market Arbitrage into a single report.
+    variant (e.g. 'replay') is added to the file name and title, so the
+    report does not overwrite the day's regular digest.
     """
     today = datetime.datetime.now().strftime('%Y-%m-%d')
     output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "output")
     os.makedirs(output_dir, exist_ok=True)
     
-    filename = os.path.join(output_dir, f"Global_Digest_{today}.md")
+    filename = os.path.join(output_dir, f"Global_Digest_{today}_{variant}.md" if variant else f"Global_Digest_{today}.md")
+    title = f"{today}, {variant}" if variant else today
     
-    report_content = f"# Global News & Market Digest Report ({today})\n\n"
+    report_content = f"# Global News & Market Digest Report ({title})\n\n"
     
     # 1. News Section
     if categorized_news:
@@ -34,8 +38,9 @@ def generate_unified_report(categorized_news=None, include_arb=True):
             for article in articles:
                 source_line = ", ".join([f"[{s['name']}]({s['link']})" for s in article['sources']])
                 report_content += f"#### {article['translated_title']} (Source: {source_line})\n\n"
+                report_content += format_thread_note(article)
                 if article['translated_summary']:
-                    truncated_summary = truncate_summary(article['translated_summary'], word_limit=100)
+                    truncated_summary = truncate_summary(article['translated_summary'], word_limit=SUMMARY_WORD_LIMIT)
                     report_content += f"{truncated_summary}\n\n"
                 report_content += "---\n\n"
     
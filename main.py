@@ -7,17 +7,30 @@ from datetime import datetime, timezone
 from tqdm import tqdm
 
 # Import utilities
-from config.settings import RSS_FEEDS
-from app.core.fetcher import fetch_all_feeds
-from app.core.translator import translate_articles
+from config.settings import RSS_FEEDS, TARGET_LANGUAGE
+from app.core.fetcher import fetch_all_feeds, iter_feeds, get_source_name
+from app.core.feed_registry import get_registry_feeds
+from app.core.translator import translate_articles, iter_translate_articles
 from app.core.processor import (
     deduplicate_and_merge_articles, 
     filter_articles, 
     apply_keyword_categorization,
-    load_categories
+    assign_categories,
+    load_categories,
+    cluster_articles,
+    ArticleClusterer,
+    select_for_translation,
+    PER_CATEGORY_LIMIT,
+    iter_filter_articles,
+    iter_deduplicate_and_merge,
+    iter_categorize_articles,
+    get_time_window,
+    is_blocked
 )
 from app.core.db import init_db
-from app.core.news_db import save_news_articles
+from app.core.news_db import save_news_articles, rehydrate_known_articles
+from app.core.article_text import enrich_articles
+from app.core.story_threads import apply_story_threads
 from app.core.unified_reporter import generate_unified_report
 from app.core.mailer import send_report_email
 
@@ -32,28 +45,13 @@ from app.collectors.cef_arbitrage import main as run_cef_arbitrage
 from app.collectors.qdii_arbitrage import main as run_qdii_arbitrage
 from app.collectors.cbond_monitor import main as run_cbond_monitor
 
-def run_news_pipeline(days=1, start_date=None, end_date=None):
-    """Fetches and processes news, returns categorized articles."""
-    print("\n>>> Running News Aggregation Task...")
-    raw_articles = fetch_all_feeds(RSS_FEEDS)
-    if not raw_articles:
-        return {}
-    filtered = filter_articles(raw_articles, days=days, start_date=start_date, end_date=end_date)
-    if not filtered:
-        return {}
-    translated = translate_articles(filtered)
-    unique = deduplicate_and_merge_articles(translated)
-    categorized_data = apply_keyword_categorization(unique)
-    
-    # Save to News Database
-    save_news_articles(categorized_data)
-    
-    # Organize into categories
+def group_by_category(articles):
+    """Organizes categorized articles into {category: [articles]} for the report."""
     keyword_map = load_categories()
     categorized = {cat: [] for cat in keyword_map.keys()}
     if "Others" not in categorized: categorized["Others"] = []
     
-    for article in categorized_data:
+    for article in articles:
         cat = article.get('category', 'Others')
         if cat in categorized:
             categorized[cat].append(article)
@@ -61,6 +59,146 @@ def run_news_pipeline(days=1, start_date=None, end_date=None):
             categorized['Others'].append(article)
     return categorized
 
+def get_feeds():
+    """
+    Enabled feeds from the registry: RSS_FEEDS first, then feeds imported via OPML.
+    Each feed's source_name is its registry title, or the name derived from its URL.
+    """
+    feeds = get_registry_feeds(RSS_FEEDS)
+    for feed in feeds:
+        feed['source_name'] = feed['title'] or get_source_name(feed['url'])
+    return feeds
+
+def stream_filtered_batches(feeds, days=1, start_date=None, end_date=None, processes=None, use_schedule=True,
+                            shards=None, replay=False, full_text=None, promoted=None):
+    """
+    Yields one batch of filtered articles per feed, in download completion order.
+    Copies of stories already seen in earlier batches are merged away before translation;
+    stories whose kept copy changed after they were yielded are appended to promoted.
+    """
+    clusterer = ArticleClusterer(promoted=promoted)
+    cutoff, end_time = get_time_window(days, start_date, end_date)
+    feed_urls = [feed['url'] for feed in feeds]
+    source_names = {feed['url']: feed['source_name'] for feed in feeds}
+    for feed_index, articles in iter_feeds(feed_urls, processes=processes, cutoff=cutoff, use_schedule=use_schedule,
+                                           shards=shards, replay=replay, end_time=end_time, source_names=source_names):
+        batch = list(iter_filter_articles(articles, days=days, start_date=start_date, end_date=end_date))
+        rehydrate_known_articles(batch, verbose=False)
+        for entry_index, article in enumerate(batch):
+            article['feed_order'] = (feed_index, entry_index)
+        batch = [article for article in batch if clusterer.add(article) is not None]
+        if enrich_articles(batch, enabled=full_text, offline=replay, verbose=False):
+            # The page text replacing a summary is checked against BLOCKED_KEYWORDS too
+            batch = [article for article in batch if not is_blocked(article)]
+        if batch:
+            yield batch
+
+def get_feed_rank(feeds):
+    """Feed priority by position in the feed list (earlier feeds rank higher)."""
+    feed_rank = {}
+    for index, feed in enumerate(feeds):
+        feed_rank.setdefault(feed['source_name'], index)
+    return feed_rank
+
+def run_news_pipeline(days=1, start_date=None, end_date=None, stream=False, per_category_limit=PER_CATEGORY_LIMIT,
+                      processes=None, use_schedule=True, shards=None, replay=False, full_text=None):
+    """
+    Fetches and processes news, returns categorized articles.
+    With per_category_limit > 0 only the top stories of each category (and
+    stories already translated by an earlier run) are translated and
+    reported; the rest are stored untranslated.
+    processes moves feed parsing, and filtering/categorization of large runs,
+    to worker processes (None = NEWS_CONFIG['parallel'], 0 = serial).
+    use_schedule=False polls every feed instead of only those due.
+    shards > 1 splits fetching across that many processes (None = NEWS_CONFIG['fetch']).
+    replay=True rebuilds the window from the raw feed archive instead of fetching;
+    it translates from the translation cache only and stores no articles or story threads.
+    full_text replaces short feed summaries with the article page text (None = NEWS_CONFIG['article_text']).
+    """
+    print("\n>>> Running News Aggregation Task...")
+    feeds = get_feeds()
+    if stream:
+        return run_news_pipeline_streaming(feeds, days=days, start_date=start_date, end_date=end_date,
+                                           processes=processes, use_schedule=use_schedule, shards=shards, replay=replay,
+                                           full_text=full_text)
+
+    # Entries older than the window are skipped while parsing
+    cutoff, end_time = get_time_window(days, start_date, end_date)
+    raw_articles = fetch_all_feeds([feed['url'] for feed in feeds], processes=processes, cutoff=cutoff,
+                                   use_schedule=use_schedule, shards=shards, replay=replay, end_time=end_time,
+                                   source_names={feed['url']: feed['source_name'] for feed in feeds})
+    if not raw_articles:
+        return {}
+    filtered = filter_articles(raw_articles, days=days, start_date=start_date, end_date=end_date, processes=processes)
+    if not filtered:
+        return {}
+    rehydrate_known_articles(filtered)
+    clustered = cluster_articles(filtered)
+    # After clustering, so copies of the same story are not downloaded
+    if enrich_articles(clustered, enabled=full_text, offline=replay):
+        # The page text replacing a summary is checked against BLOCKED_KEYWORDS too
+        kept = [article for article in clustered if not is_blocked(article)]
+        if len(kept) < len(clustered):
+            print(f"    => {len(clustered) - len(kept)} articles blocked by their full text.")
+        clustered = kept
+    if per_category_limit:
+        selected, overflow = select_for_translation(clustered, per_category_limit, get_feed_rank(feeds),
+                                                    processes=processes)
+        # Overflow stories already translated (rehydrated from the news DB) cost nothing to report
+        selected = {id(article) for article in selected}
+        clustered = [article for article in clustered if id(article) in selected or article.get('translated_title')]
+        overflow = [article for article in overflow if not article.get('translated_title')]
+        for article in overflow:
+            article['translated_title'] = None
+            article['translated_summary'] = None
+        if not replay:
+            save_news_articles(overflow)
+    translated = translate_articles(clustered, offline=replay)
+    unique = deduplicate_and_merge_articles(translated)
+    categorized_data = apply_keyword_categorization(unique, processes=processes)
+    
+    # Save to News Database (a replay only rebuilds the report)
+    if not replay:
+        save_news_articles(categorized_data)
+    reported = apply_story_threads(categorized_data, persist=not replay)
+    
+    # Organize into categories
+    return group_by_category(reported)
+
+def run_news_pipeline_streaming(feeds, days=1, start_date=None, end_date=None, processes=None, use_schedule=True,
+                                shards=None, replay=False, full_text=None):
+    """
+    Streaming variant: articles flow fetch -> filter -> translate -> merge -> categorize
+    as generators, so translation starts as soon as the first feed arrives.
+    Only the final list for saving and grouping is materialized.
+    """
+    print(f"\n[Stream] Fetching {len(feeds)} feeds and translating to {TARGET_LANGUAGE} as they arrive...")
+    promoted = []
+    stream = stream_filtered_batches(feeds, days=days, start_date=start_date, end_date=end_date, processes=processes,
+                                     use_schedule=use_schedule, shards=shards, replay=replay, full_text=full_text,
+                                     promoted=promoted)
+    stream = iter_translate_articles(stream, offline=replay)
+    stream = iter_deduplicate_and_merge(stream, promoted=promoted)
+    stream = iter_categorize_articles(stream)
+    categorized_data = list(tqdm(stream, desc="Streaming"))
+    if not categorized_data:
+        return {}
+
+    # Stories that took over a copy from a later-finishing feed (the one the
+    # batch path keeps) are translated and categorized again from that copy
+    kept = {id(article) for article in categorized_data}
+    promoted = list({id(article): article for article in promoted if id(article) in kept}.values())
+    if promoted:
+        print(f"[Stream] {len(promoted)} stories keep a copy that arrived late, translating it...")
+        translate_articles(promoted, offline=replay)
+        assign_categories(promoted, processes=processes)
+
+    # Feeds complete in arbitrary order; restore feed-list order for the report
+    categorized_data.sort(key=lambda article: article['feed_order'])
+    if not replay:
+        save_news_articles(categorized_data)
+    return group_by_category(apply_story_threads(categorized_data, persist=not replay))
+
 def run_arb_pipeline():
     """Runs all market arbitrage collectors."""
     print("\n>>> Running Market Arbitrage Tasks...")
@@ -92,9 +230,19 @@ def main():
     parser.add_argument('--arb', action='store_true', help="Run only market arb task")
     parser.add_argument('--days', type=int, default=1, help="News: Fetch from last N days")
     parser.add_argument('--mail', action='store_true', help="Send final report via email")
+    parser.add_argument('--stream', action='store_true', help="News: Stream articles through translation as feeds arrive")
+    parser.add_argument('--processes', type=int, default=None, help="News: Worker processes for feed parsing, filtering and categorizing (0 = serial, -1 = all cores)")
+    parser.add_argument('--shards', type=int, default=None, help="News: Fetcher processes, feeds split between them by consistent hashing of their hosts (1 = no sharding)")
+    parser.add_argument('--replay', action='store_true', help="News: Rebuild the digest for --days from the raw feed archive, without network access or saving articles (implies --news only)")
+    parser.add_argument('--full-text', action='store_true', default=None, help="News: Fetch article pages to replace one-line feed summaries")
+    parser.add_argument('--all-feeds', action='store_true', help="News: Poll every feed, ignoring the learned schedule")
+    parser.add_argument('--top', type=int, default=PER_CATEGORY_LIMIT, help="News: Translate only the top N stories per category (0 = all, ignored with --stream)")
     
     args = parser.parse_args()
     
+    if args.replay:
+        # The arb collectors always hit the network
+        args.news, args.arb, args.all = True, False, False
     if not (args.news or args.arb):
         args.all = True
         
@@ -105,13 +253,16 @@ def main():
     
     categorized_news = None
     if args.all or args.news:
-        categorized_news = run_news_pipeline(days=args.days)
+        categorized_news = run_news_pipeline(days=args.days, stream=args.stream, per_category_limit=args.top, processes=args.processes,
+                                             use_schedule=not args.all_feeds, shards=args.shards, replay=args.replay,
+                                             full_text=args.full_text)
         
     if args.all or args.arb:
         run_arb_pipeline()
         
     print("\n>>> Generating Unified Intelligence Report...")
-    report_path = generate_unified_report(categorized_news, include_arb=(args.all or args.arb))
+    report_path = generate_unified_report(categorized_news, include_arb=(args.all or args.arb),
+                                          variant='replay' if args.replay else None)
     
     if report_path:
         print(f"[OK] Report generated: {report_path}")